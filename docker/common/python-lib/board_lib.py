@@ -1,15 +1,29 @@
 #!/usr/bin/env python3
 
 import base64
-from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import contextlib
+from datetime import datetime, timedelta
 import functools
+import hashlib
 import json
 import logging
 import math
+import multiprocessing
+import os
+import re
+import resource
 import secrets
+import tempfile
+import threading
 import time
+import urllib.parse
 import zlib
 import redis
+import requests
+import schedule
+from requests.adapters import HTTPAdapter
 
 
 # some function
@@ -17,17 +31,27 @@ def byte_xor(bytes_1, bytes_2):
     return bytes([_a ^ _b for _a, _b in zip(bytes_1, bytes_2)])
 
 
+# some exception
+class SourceOfflineError(requests.ConnectionError):
+    # raise by HttpClient when a source fail (request exception) or when its circuit breaker is open
+    pass
+
+
 def catch_log_except(catch=None, log_lvl=logging.ERROR, limit_arg_len=40):
     # decorator to catch exception and produce one line log message
+    # WARN: SourceOfflineError is log at debug level (state changes of sources are already log by CircuitBreaker)
     if catch is None:
         catch = Exception
 
     def _catch_log_except(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            # keep last catched exception as wrapper attribute (job outcome for JobExecutor)
+            wrapper.last_except = None
             try:
                 return func(*args, **kwargs)
             except catch as e:
+                wrapper.last_except = e
                 # format function call "f_name(args..., kwargs...)" string (with arg/kwargs len limit)
                 func_args = ''
                 for arg in args:
@@ -39,7 +63,8 @@ def catch_log_except(catch=None, log_lvl=logging.ERROR, limit_arg_len=40):
                     func_args += repr(v) if len(repr(v)) < limit_arg_len else repr(v)[:limit_arg_len - 2] + '..'
                 func_call = f'{func.__name__}({func_args})'
                 # log message "except [except class] in f_name(args..., kwargs...): [except msg]"
-                logging.log(log_lvl, f'except {type(e)} in {func_call}: {e}')
+                lvl = logging.DEBUG if isinstance(e, SourceOfflineError) else log_lvl
+                logging.log(lvl, f'except {type(e)} in {func_call}: {e}')
 
         return wrapper
 
@@ -52,6 +77,42 @@ def dt_utc_to_local(utc_dt):
     return utc_dt + offset
 
 
+def _cpu_pool_init(mem_limit):
+    # CpuPool worker init: cap the address space of this process
+    if mem_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (mem_limit, mem_limit))
+
+
+def scale_schedule(speedup, scheduler=None):
+    # run all schedule jobs (and their JobExecutor deadline) speedup times faster (for load tests)
+    # WARN: jobs at a fixed time of day (like every().day.at('06:00')) are unchanged
+    if scheduler is None:
+        scheduler = schedule.default_scheduler
+    for job in scheduler.jobs:
+        if job.at_time is not None or job.latest is not None:
+            continue
+        job.interval = timedelta(**{job.unit: job.interval}).total_seconds() / speedup
+        job.unit = 'seconds'
+        job_func = job.job_func
+        if job_func.keywords.get('deadline'):
+            kwargs = dict(job_func.keywords, deadline=job_func.keywords['deadline'] / speedup)
+            job.job_func = functools.update_wrapper(functools.partial(job_func.func, *job_func.args, **kwargs),
+                                                    job_func.func)
+        job._schedule_next_run()
+    logging.warning(f'schedule speedup is set to x{speedup}')
+
+
+def upstream_url(url):
+    # redirect upstream url to a local mock server if env var "BOARD_UPSTREAM_URL" is set (for load tests)
+    # https://host/path?query -> $BOARD_UPSTREAM_URL/host/path?query
+    mock_url = os.getenv('BOARD_UPSTREAM_URL')
+    if not mock_url:
+        return url
+    url_parts = urllib.parse.urlsplit(url)
+    new_url = f'{mock_url.rstrip("/")}/{url_parts.netloc}{url_parts.path}'
+    return f'{new_url}?{url_parts.query}' if url_parts.query else new_url
+
+
 def dweet_encode(bytes_data: bytes, dweet_key: str):
     # compress data
     c_data = zlib.compress(bytes_data)
@@ -90,11 +151,18 @@ def dweet_decode(b64_msg_block: bytes, dweet_key: str):
 # some class
 class CustomRedis(redis.Redis):
     LOG_LEVEL = logging.ERROR
+    DIGEST_KEY = 'meta:digest'
+    SRC_DIGEST_KEY = 'meta:src-digest'
+    VERSION_KEY = 'meta:version'
 
     @catch_log_except(catch=redis.RedisError, log_lvl=LOG_LEVEL)
     def execute_command(self, *args, **options):
+        JobMetrics.add_written(args)
         return super().execute_command(*args, **options)
 
+    def pipeline(self, transaction=True, shard_hint=None):
+        return CustomPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
     @catch_log_except(catch=(redis.RedisError, AttributeError, json.decoder.JSONDecodeError), log_lvl=LOG_LEVEL)
     def set_as_json(self, name, obj, ex=None, px=None, nx=False, xx=False, keepttl=False):
         return super().set(name=name, value=json.dumps(obj), ex=ex, px=px, nx=nx, xx=xx, keepttl=keepttl)
@@ -102,3 +170,1107 @@ class CustomRedis(redis.Redis):
     @catch_log_except(catch=(redis.RedisError, AttributeError, json.decoder.JSONDecodeError), log_lvl=LOG_LEVEL)
     def get_from_json(self, name):
         return json.loads(super().get(name).decode('utf-8'))
+
+    @catch_log_except(catch=(redis.RedisError, AttributeError), log_lvl=LOG_LEVEL)
+    def set_if_changed(self, name, value, ex=None):
+        # write value only if its content change since last write (digest compare), return True if value is write
+        # if unchanged: only refresh TTL of name (avoid replication of an identical value to slaves)
+        # on write, the version counter of name (in "meta:version" hash) is increment
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        digest = hashlib.sha1(value).hexdigest()
+        if self.hget(self.DIGEST_KEY, name) == digest.encode():
+            key_alive = self.expire(name, ex) if ex else self.exists(name)
+            if key_alive:
+                return False
+        pipe = self.pipeline()
+        pipe.set(name, value, ex=ex)
+        pipe.hset(self.DIGEST_KEY, name, digest)
+        pipe.hincrby(self.VERSION_KEY, name, 1)
+        pipe.execute()
+        return True
+
+    def set_as_json_if_changed(self, name, obj, ex=None):
+        return self.set_if_changed(name, json.dumps(obj), ex=ex)
+
+    @catch_log_except(catch=redis.RedisError, log_lvl=LOG_LEVEL)
+    def mset_if_changed(self, values_d, ex=None):
+        # set_if_changed() for several keys ({name: value}) with one digests read and one pipeline write
+        # return the list of written names (others are unchanged), None on redis error (some keys may be not write)
+        if not values_d:
+            return []
+        names_l = list(values_d)
+        values_l = [v.encode('utf-8') if isinstance(v, str) else v for v in values_d.values()]
+        digests_l = [hashlib.sha1(value).hexdigest() for value in values_l]
+        last_digests_l = self.hmget(self.DIGEST_KEY, names_l) or [None] * len(names_l)
+        # refresh TTL of unchanged keys (a gone key is write)
+        pipe = self.pipeline()
+        unchanged_l = [n for n, d, last_d in zip(names_l, digests_l, last_digests_l) if last_d == d.encode()]
+        for name in unchanged_l:
+            if ex:
+                pipe.expire(name, ex)
+            else:
+                pipe.exists(name)
+        alive_d = dict(zip(unchanged_l, pipe.execute() or [False] * len(unchanged_l)))
+        # write changed keys
+        pipe = self.pipeline()
+        written_l = []
+        for name, value, digest in zip(names_l, values_l, digests_l):
+            if not alive_d.get(name):
+                pipe.set(name, value, ex=ex)
+                pipe.hset(self.DIGEST_KEY, name, digest)
+                pipe.hincrby(self.VERSION_KEY, name, 1)
+                written_l.append(name)
+        if written_l:
+            pipe.execute()
+        return written_l
+
+    @staticmethod
+    def src_digest(src_obj):
+        # digest of a json serializable source object (dict keys order is ignored)
+        return hashlib.sha1(json.dumps(src_obj, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_src_unchanged(self, name, src_obj, ex=None):
+        # return True if name was build from the same source object (see set_src_digest) and still exist
+        # use it to skip an expensive build step (like an image render) when its inputs are unchanged
+        # if unchanged: TTL of name is refresh
+        if self.hget(self.SRC_DIGEST_KEY, name) != self.src_digest(src_obj).encode():
+            return False
+        return bool(self.expire(name, ex) if ex else self.exists(name))
+
+    def set_src_digest(self, name, src_obj):
+        return self.hset(self.SRC_DIGEST_KEY, name, self.src_digest(src_obj))
+
+
+class CustomPipeline(redis.client.Pipeline):
+    def pipeline_execute_command(self, *args, **options):
+        JobMetrics.add_written(args)
+        return super().pipeline_execute_command(*args, **options)
+
+
+class JobMetrics:
+    # metrics of scheduled jobs: duration histogram, queue lag (JobExecutor), bytes fetched (HttpClient),
+    # bytes written to redis (CustomRedis), outcome and last success
+    # WARNs: -> metrics are publish after each run as json in redis hash "board:metrics:<app>" (one field by job)
+    #           and optionally as a Prometheus textfile (for node_exporter textfile collector)
+    #        -> bytes counters use a thread local context: only IO done by the job thread is count
+    #        -> written bytes only count args of redis write commands (WRITE_CMDS), reads are not count
+    #        -> a job outcome is 'error' if it raise or if catch_log_except catch an exception (last_except)
+    #        -> with publish_every (in s), metrics are accumulate in memory and publish at most once by period (or
+    #           when a job outcome change): avoid a redis write (replicate to slaves) after every run of fast jobs
+    BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+    WRITE_CMDS = frozenset(('APPEND', 'COPY', 'DEL', 'EXPIRE', 'HDEL', 'HINCRBY', 'HMSET', 'HSET', 'MSET', 'PEXPIRE',
+                            'PUBLISH', 'RENAME', 'SET', 'SETEX', 'UNLINK'))
+    _ctx = threading.local()
+
+    def __init__(self, app, db=None, textfile=None, publish_every=None):
+        # public
+        self.app = app
+        self.db = db
+        self.textfile = textfile
+        self.publish_every = publish_every
+        # private
+        self._lock = threading.Lock()
+        self._jobs_d = {}
+        self._unpublished_set = set()
+        self._last_publish = 0.0
+
+    @property
+    def key(self):
+        return f'board:metrics:{self.app}'
+
+    @classmethod
+    def add_fetched(cls, nb_bytes):
+        if getattr(cls._ctx, 'job', None) is not None:
+            cls._ctx.job['fetched'] += nb_bytes
+
+    @classmethod
+    def add_written(cls, cmd_args):
+        # cmd_args is a redis command as send by redis-py: ('SET', name, value, ...)
+        if getattr(cls._ctx, 'job', None) is None or not cmd_args:
+            return
+        cmd = cmd_args[0].decode() if isinstance(cmd_args[0], bytes) else str(cmd_args[0])
+        if cmd.upper() in cls.WRITE_CMDS:
+            cls._ctx.job['written'] += sum(len(a) for a in cmd_args if isinstance(a, (bytes, str)))
+
+    def run(self, job, lag=0.0):
+        # run a job and record its metrics, can be call by schedule: schedule.every(2).minutes.do(metrics.run, my_job)
+        # lag is the time (in s) the job wait in queue before this call (see JobExecutor)
+        ctx_d = dict(fetched=0, written=0)
+        self._ctx.job = ctx_d
+        t_start = time.time()
+        t_mono = time.monotonic()
+        outcome = 'ok'
+        try:
+            ret = job()
+            if getattr(job, 'last_except', None):
+                outcome = 'error'
+            return ret
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            self._ctx.job = None
+            self._record(job.__name__, t_start, time.monotonic() - t_mono, lag, outcome, ctx_d)
+
+    def _record(self, name, t_start, duration, lag, outcome, ctx_d):
+        with self._lock:
+            job_d = self._jobs_d.setdefault(name, dict(runs=dict(ok=0, error=0), buckets=[0] * len(self.BUCKETS),
+                                                       duration_sum=0.0, lag_sum=0.0, lag_max=0.0,
+                                                       fetched=0, written=0, last_success=None))
+            outcome_change = job_d.get('last_outcome') != outcome
+            job_d['runs'][outcome] += 1
+            for i, le in enumerate(self.BUCKETS):
+                if duration <= le:
+                    job_d['buckets'][i] += 1
+            job_d['duration_sum'] += duration
+            job_d['lag_sum'] += lag
+            job_d['lag_max'] = max(job_d['lag_max'], round(lag, 3))
+            job_d['fetched'] += ctx_d['fetched']
+            job_d['written'] += ctx_d['written']
+            job_d.update(last_start=t_start, last_duration=round(duration, 3), last_lag=round(lag, 3),
+                         last_outcome=outcome, last_fetched=ctx_d['fetched'], last_written=ctx_d['written'])
+            if outcome == 'ok':
+                job_d['last_success'] = t_start + duration
+            self._unpublished_set.add(name)
+            # wait publish period
+            t_now = time.monotonic()
+            if self.publish_every and not outcome_change and t_now - self._last_publish < self.publish_every:
+                return
+            self._last_publish = t_now
+            jobs_js_d = {n: json.dumps(self._jobs_d[n]) for n in self._unpublished_set}
+            self._unpublished_set.clear()
+            prom_txt = self._prometheus_txt() if self.textfile else None
+        # publish (out of job context: not count as job written bytes)
+        if self.db is not None:
+            try:
+                self.db.hset(self.key, mapping=jobs_js_d)
+            except redis.RedisError:
+                pass
+        if prom_txt is not None:
+            try:
+                tmp_file = self.textfile + '.tmp'
+                with open(tmp_file, 'w') as f:
+                    f.write(prom_txt)
+                os.replace(tmp_file, self.textfile)
+            except OSError as e:
+                logging.warning(f'unable to write metrics textfile "{self.textfile}": {e}')
+
+    def _prometheus_txt(self):
+        # call with self._lock held (lines of a metric family must be contiguous)
+        jobs_l = [(f'app="{self.app}",job="{name}"', job_d) for name, job_d in sorted(self._jobs_d.items())]
+        lines_l = ['# TYPE board_job_duration_seconds histogram']
+        for lbl, job_d in jobs_l:
+            count = sum(job_d['runs'].values())
+            for le, nb in zip(self.BUCKETS, job_d['buckets']):
+                lines_l.append(f'board_job_duration_seconds_bucket{{{lbl},le="{le}"}} {nb}')
+            lines_l.append(f'board_job_duration_seconds_bucket{{{lbl},le="+Inf"}} {count}')
+            lines_l.append(f'board_job_duration_seconds_sum{{{lbl}}} {job_d["duration_sum"]:.3f}')
+            lines_l.append(f'board_job_duration_seconds_count{{{lbl}}} {count}')
+        lines_l.append('# TYPE board_job_queue_lag_seconds_total counter')
+        lines_l += [f'board_job_queue_lag_seconds_total{{{lbl}}} {job_d["lag_sum"]:.3f}' for lbl, job_d in jobs_l]
+        lines_l.append('# TYPE board_job_runs_total counter')
+        for lbl, job_d in jobs_l:
+            for outcome, nb in job_d['runs'].items():
+                lines_l.append(f'board_job_runs_total{{{lbl},outcome="{outcome}"}} {nb}')
+        lines_l.append('# TYPE board_job_fetched_bytes_total counter')
+        lines_l += [f'board_job_fetched_bytes_total{{{lbl}}} {job_d["fetched"]}' for lbl, job_d in jobs_l]
+        lines_l.append('# TYPE board_job_written_bytes_total counter')
+        lines_l += [f'board_job_written_bytes_total{{{lbl}}} {job_d["written"]}' for lbl, job_d in jobs_l]
+        lines_l.append('# TYPE board_job_last_success_timestamp_seconds gauge')
+        lines_l += [f'board_job_last_success_timestamp_seconds{{{lbl}}} {job_d["last_success"]:.0f}'
+                    for lbl, job_d in jobs_l if job_d['last_success']]
+        return '\n'.join(lines_l) + '\n'
+
+
+class CircuitBreaker:
+    # circuit breaker for an upstream source (closed -> open -> half-open -> closed)
+    # WARNs: -> after fail_max consecutive failures the breaker open: requests are refuse during backoff delay
+    #        -> at end of backoff, only one request (the probe) is allowed, it close the breaker on success or
+    #           reopen it with a doubled backoff (up to backoff_max) on failure
+    #        -> only state changes are log (not each failure) and publish to redis hash "board:sources" of db
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+    SOURCES_KEY = 'board:sources'
+
+    def __init__(self, name, fail_max=3, backoff_min=60.0, backoff_max=3600.0, db=None):
+        # public
+        self.name = name
+        self.fail_max = fail_max
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.db = db
+        # private
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._fails = 0
+        self._backoff = backoff_min
+        self._retry_at = 0.0
+        self._last_error = ''
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        # return True if a request can be send to the source now
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() >= self._retry_at:
+                self._set_state(self.HALF_OPEN)
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self._fails = 0
+            self._backoff = self.backoff_min
+            if self._state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def failure(self, error=''):
+        with self._lock:
+            self._fails += 1
+            self._last_error = str(error)
+            if self._state == self.HALF_OPEN:
+                self._backoff = min(self._backoff * 2, self.backoff_max)
+            elif self._state == self.CLOSED and self._fails < self.fail_max:
+                return
+            self._retry_at = time.monotonic() + self._backoff
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        # call with self._lock held
+        prev_state, self._state = self._state, state
+        if state == self.OPEN:
+            logging.warning(f'source "{self.name}" is offline after {self._fails} failure(s) '
+                            f'(retry in {self._backoff:.0f}s): {self._last_error}')
+        elif state == self.CLOSED:
+            logging.warning(f'source "{self.name}" is back online')
+        else:
+            logging.debug(f'source "{self.name}" is {state} (previous state: {prev_state})')
+        if self.db is not None:
+            state_d = dict(state=state, fails=self._fails, error=self._last_error,
+                           update=datetime.now().astimezone().isoformat(),
+                           retry=round(time.time() + max(self._retry_at - time.monotonic(), 0.0)))
+            try:
+                self.db.hset(self.SOURCES_KEY, self.name, json.dumps(state_d))
+            except redis.RedisError:
+                pass
+
+
+class HttpClient:
+    # shared HTTP client for fetchers: one pooled requests session (keep-alive) by host
+    # WARNs: -> requests sessions are share between jobs threads, don't change their state after init
+    #        -> conditional requests validators (ETag, Last-Modified) are store in cache_db redis hash
+    #           "http:validators" (as json by url) by store_validators(), once the job result is write
+    #        -> each host have a circuit breaker: a request exception or an HTTP error status (>= 400) is a failure,
+    #           when the breaker is open a SourceOfflineError is raise without network access (state in "board:sources")
+    #        -> request exceptions are raise as SourceOfflineError (log at debug level by catch_log_except)
+    #        -> requests are redirect to a mock server if env var "BOARD_UPSTREAM_URL" is set (see upstream_url())
+    VALIDATORS_KEY = 'http:validators'
+
+    def __init__(self, timeout=5.0, user_agent=None, pool_maxsize=4, cache_db=None):
+        # public
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.pool_maxsize = pool_maxsize
+        self.cache_db = cache_db
+        # private
+        self._sessions_d = {}
+        self._breakers_d = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host(url):
+        url_parts = urllib.parse.urlsplit(url)
+        return f'{url_parts.scheme}://{url_parts.netloc}'
+
+    def breaker(self, url):
+        # return the circuit breaker of url host (create it at first call)
+        host = self._host(url)
+        with self._lock:
+            if host not in self._breakers_d:
+                self._breakers_d[host] = CircuitBreaker(name=urllib.parse.urlsplit(url).netloc, db=self.cache_db)
+            return self._breakers_d[host]
+
+    def session(self, url):
+        # return the session of url host (create it at first call)
+        host = self._host(url)
+        with self._lock:
+            if host not in self._sessions_d:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                if self.user_agent:
+                    session.headers['User-Agent'] = self.user_agent
+                self._sessions_d[host] = session
+            return self._sessions_d[host]
+
+    def get(self, url, valid=None, **kwargs):
+        # HTTP GET with default timeout (through the circuit breaker of url host)
+        # valid is an optional callable (response -> bool) to report bad content (like an empty dataset) as a failure
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise SourceOfflineError(f'source "{breaker.name}" is offline')
+        kwargs.setdefault('timeout', self.timeout)
+        url = upstream_url(url)
+        try:
+            r = self.session(url).get(url, **kwargs)
+        except requests.RequestException as e:
+            breaker.failure(e)
+            raise SourceOfflineError(f'source "{breaker.name}" request error: {e}') from e
+        if not kwargs.get('stream'):
+            JobMetrics.add_fetched(len(r.content))
+        if r.status_code >= 400:
+            breaker.failure(f'HTTP status {r.status_code}')
+        elif valid is not None and not self._is_valid(r, valid):
+            breaker.failure('invalid content')
+        else:
+            breaker.success()
+        return r
+
+    @staticmethod
+    def _is_valid(r, valid):
+        # any error of valid callable (like AttributeError on an unexpected json) is an invalid content
+        # WARN: success() or failure() must always be call (a half-open breaker wait for it)
+        try:
+            return bool(valid(r))
+        except Exception:
+            return False
+
+    def get_if_modified(self, url, key, ex=None, **kwargs):
+        # conditional HTTP GET: return None if url content is unchanged (HTTP 304) since the last call
+        # in this case, redis key (the job result) TTL is refresh with ex, if key is gone do a full request
+        # WARN: validators of a new content are not store here, call store_validators() after the write of the job
+        #       result (a parse or write error must not turn next requests into HTTP 304)
+        validators_d = {}
+        try:
+            validators_d = json.loads(self.cache_db.hget(self.VALIDATORS_KEY, url))
+        except (TypeError, ValueError):
+            pass
+        cond_headers = dict(kwargs.pop('headers', {}))
+        full_headers = dict(cond_headers)
+        if validators_d.get('etag'):
+            cond_headers['If-None-Match'] = validators_d['etag']
+        if validators_d.get('last_modified'):
+            cond_headers['If-Modified-Since'] = validators_d['last_modified']
+        r = self.get(url, headers=cond_headers, **kwargs)
+        if r.status_code == 304:
+            key_alive = self.cache_db.expire(key, ex) if ex else self.cache_db.exists(key)
+            if key_alive:
+                logging.debug(f'"{url}" is unchanged: skip it')
+                return None
+            r = self.get(url, headers=full_headers, **kwargs)
+        return r
+
+    def store_validators(self, url, r):
+        # store validators of response r to a get_if_modified() of url (next requests are conditional)
+        if r.status_code == 200:
+            validators_d = dict(etag=r.headers.get('ETag'), last_modified=r.headers.get('Last-Modified'))
+            if validators_d['etag'] or validators_d['last_modified']:
+                self.cache_db.hset(self.VALIDATORS_KEY, url, json.dumps(validators_d))
+
+
+class CameraSource:
+    # an image source (like a webcam) publish in redis as a labeled PNG thumbnail
+    # WARNs: -> cameras list is read from a board.conf section (one camera by line: "name = label, url"),
+    #           the defaults list is use if the section is missing
+    #        -> fetch_all() download images in parallel threads with a global deadline: a camera that doesn't respond
+    #           in time is skip (retry at next run), unchanged images (HTTP 304) are skip too
+    #        -> HTTP validators of an image are only store by the caller (with store_validators()) after its write
+    #        -> fetch_all() threads are not the job thread: their bytes are not count by JobMetrics
+
+    def __init__(self, name, label, url, key):
+        # public
+        self.name = name
+        self.label = label
+        self.url = url
+        self.key = key
+
+    def __repr__(self):
+        return f'CameraSource(name={self.name!r}, url={self.url!r})'
+
+    @classmethod
+    def from_conf(cls, cnf, section, key_fmt, defaults_l=()):
+        # build cameras list from cnf section or from defaults_l (list of (name, label, url))
+        # key_fmt is the redis key format of the PNG (like 'img:dir-est:{name}:png')
+        if cnf.has_section(section):
+            cams_l = []
+            for name, value in cnf.items(section):
+                label, _, url = [s.strip() for s in value.partition(',')]
+                cams_l.append((name, label, url))
+        else:
+            cams_l = defaults_l
+        return [cls(name, label, url, key_fmt.format(name=name)) for name, label, url in cams_l]
+
+    def fetch(self, http_cli, ex=None):
+        # return image response or None if it's unchanged since last fetch or unavailable
+        r = http_cli.get_if_modified(self.url, key=self.key, ex=ex)
+        if r is not None and r.status_code == 200:
+            return r
+        return None
+
+    def store_validators(self, http_cli, r):
+        # call it once the image of response r is write
+        http_cli.store_validators(self.url, r)
+
+    @staticmethod
+    def fetch_all(cameras, http_cli, ex=None, deadline=15.0, max_workers=4):
+        # fetch cameras in parallel, return the dict {camera: image response} of the updated ones
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cam-fetch')
+        futures_d = {}
+        try:
+            futures_d = {pool.submit(cam.fetch, http_cli, ex=ex): cam for cam in cameras}
+            done, not_done = wait(futures_d, timeout=deadline)
+            for future in not_done:
+                logging.warning(f'camera "{futures_d[future].name}" fetch is not done after {deadline}s -> skip it')
+            resp_d = {}
+            for future in done:
+                try:
+                    r = future.result()
+                except requests.RequestException as e:
+                    logging.debug(f'camera "{futures_d[future].name}" fetch error: {e}')
+                    continue
+                if r is not None:
+                    resp_d[futures_d[future]] = r
+            return resp_d
+        finally:
+            # cancel queued fetches and don't wait for stuck threads (they end at requests timeout)
+            # WARN: no shutdown(cancel_futures=True), it's not available before Python 3.9 (debian buster have 3.7)
+            for future in futures_d:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+
+class FileCache:
+    # content-addressed file cache (like a conversion cache: key = source md5 + output geometry)
+    # WARNs: -> files are written atomically (tmp file + rename), so a cache shared by processes is safe
+    #        -> when total size is above max_size (in bytes), least recently used files are removed
+    #        -> cache is disabled (all get miss, set do nothing) if path is not writable
+
+    def __init__(self, path, max_size=256 * 1024 * 1024):
+        # public
+        self.path = path
+        self.max_size = max_size
+        # private
+        self._lock = threading.Lock()
+        self._enabled = True
+        try:
+            os.makedirs(path, exist_ok=True)
+            if not os.access(path, os.W_OK):
+                raise PermissionError(f'"{path}" is not writable')
+        except OSError as e:
+            logging.warning(f'file cache is disabled: {e}')
+            self._enabled = False
+
+    def _file(self, key):
+        # keep key chars safe for a filename
+        return os.path.join(self.path, re.sub(r'[^\w.\-]', '_', key))
+
+    def get(self, key):
+        # return cached data of key or None if not in cache
+        if not self._enabled:
+            return None
+        try:
+            with open(self._file(key), 'rb') as f:
+                data = f.read()
+            # update access time (for prune)
+            os.utime(self._file(key))
+            return data
+        except OSError:
+            return None
+
+    def set(self, key, data):
+        if not self._enabled:
+            return
+        try:
+            tmp_file = f'{self._file(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, self._file(key))
+        except OSError as e:
+            logging.warning(f'unable to write "{key}" to file cache: {e}')
+            return
+        self._prune()
+
+    def _prune(self):
+        # remove older files while cache size is above max_size
+        with self._lock:
+            try:
+                files_l = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in os.scandir(self.path) if e.is_file()]
+            except OSError:
+                return
+            total_size = sum(size for _, size, _ in files_l)
+            for _, size, path in sorted(files_l):
+                if total_size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                    total_size -= size
+                except OSError:
+                    pass
+
+
+class BlobStore:
+    # content-addressed store of large values (PDF, images): a value is write once as "blob:<sha256>" and directory
+    # hashes (ref keys) only hold its digest, so an identical file in several directories is stored (and replicated
+    # to slaves) once, HMIs only fetch a blob when a digest change
+    # WARNs: -> blobs have no TTL: gc() remove blobs that no ref key reference
+    #        -> put() and the write of its ref must be done under lock (a gc() between them would remove the blob)
+    #        -> with chunk_size set, a blob above it is store as "blob:<sha256>:<n>" chunks of chunk_size bytes and an
+    #           index hash "blob:<sha256>:index" (size, chunk_size, chunks): no redis command carry more than a chunk
+    #           and read() of a range only fetch its chunks
+    PREFIX = 'blob:'
+    CHUNK_SIZE = 256 * 1024
+    READ_BATCH = 8
+
+    def __init__(self, db, chunk_size=None):
+        # public
+        self.db = db
+        self.chunk_size = chunk_size
+        self.ref_keys = set()
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def key(self, digest):
+        return f'{self.PREFIX}{digest}'
+
+    def put(self, data, pipe=None):
+        # store data if not already there, return its digest (the ref to store in a ref key)
+        # with pipe, the write is queue in this pipeline
+        digest = self.digest(data)
+        key = self.key(digest)
+        if self.db.exists(key, f'{key}:index'):
+            return digest
+        w_pipe = pipe or self.db.pipeline()
+        if self.chunk_size and len(data) > self.chunk_size:
+            nb_chunks = math.ceil(len(data) / self.chunk_size)
+            for n in range(nb_chunks):
+                w_pipe.set(f'{key}:{n}', data[n * self.chunk_size:(n + 1) * self.chunk_size])
+            # index is write last: a reader never see an index without its chunks
+            w_pipe.hset(f'{key}:index', mapping=dict(size=len(data), chunk_size=self.chunk_size, chunks=nb_chunks))
+        else:
+            w_pipe.set(key, data)
+        if pipe is None:
+            w_pipe.execute()
+        return digest
+
+    def get(self, digest):
+        return self.read(digest)
+
+    def read(self, digest, offset=0, length=None):
+        # read length bytes (all if None) of a blob from offset, return None if blob is unknown (or incomplete)
+        key = self.key(digest)
+        index_d = self.db.hgetall(f'{key}:index')
+        if not index_d:
+            if not offset and length is None:
+                return self.db.get(key)
+            # a range at or past end of value is b'' (like a chunked blob), an unknown blob is None
+            pipe = self.db.pipeline(transaction=False)
+            pipe.exists(key)
+            if length != 0:
+                pipe.getrange(key, offset, -1 if length is None else offset + length - 1)
+            exists, *data_l = pipe.execute()
+            return (data_l[0] if data_l else b'') if exists else None
+        size, chunk_size = int(index_d[b'size']), int(index_d[b'chunk_size'])
+        stop = size if length is None else min(size, offset + length)
+        if offset >= stop:
+            return b''
+        first, last = offset // chunk_size, (stop - 1) // chunk_size
+        chunks_l = []
+        for batch_first in range(first, last + 1, self.READ_BATCH):
+            pipe = self.db.pipeline(transaction=False)
+            for n in range(batch_first, min(batch_first + self.READ_BATCH, last + 1)):
+                pipe.get(f'{key}:{n}')
+            chunks_l.extend(pipe.execute())
+        if None in chunks_l:
+            return None
+        data = b''.join(chunks_l)
+        return data[offset - first * chunk_size:stop - first * chunk_size]
+
+    def gc(self):
+        # remove unreferenced blobs (with their chunks), return the number of removed keys
+        # WARN: any redis error abort it (an incomplete refs read must not remove a blob)
+        if not self.ref_keys:
+            return 0
+        with self.lock:
+            pipe = self.db.pipeline()
+            for ref_key in self.ref_keys:
+                pipe.hvals(ref_key)
+            refs_set = {digest.decode() for values_l in pipe.execute() for digest in values_l}
+            # key is "blob:<sha256>", "blob:<sha256>:index" or "blob:<sha256>:<n>"
+            unused_l = [key for key in self.db.scan_iter(match=f'{self.PREFIX}*', count=100)
+                        if key.decode()[len(self.PREFIX):].split(':')[0] not in refs_set]
+            for n in range(0, len(unused_l), 100):
+                self.db.unlink(*unused_l[n:n + 100])
+            return len(unused_l)
+
+
+class WebDAVSync:
+    # sync of a WebDAV directory to a pair of redis hashes: raw hash (file name -> transformed content or, with a
+    # BlobStore, its blob digest) and infos hash (file name -> json manifest: size, md5, etag, mtime)
+    # WARNs: -> wdv is a webdav.WebDAV instance, change detection use manifest etag (if server send it), otherwise
+    #           size and mtime, a manifest without them (previous versions) is check by a HEAD request (OwnCloud md5
+    #           checksum) if head_verify is set, otherwise the file is download again
+    #        -> push_changes() queue delta items of WebDAV.sync_collection(): next run() only process them (cost scale
+    #           with changes), without pending changes run() compare the full directory listing to the manifest
+    #        -> files are download in parallel to download_dir (a partial file is resume at next run), then pass to
+    #           transform (callable: file name, local path, manifest dict -> bytes or a Future of bytes)
+    #        -> removals and manifest refreshes are write in one pipeline, then every updated file in its own pipeline
+    #           as soon as its transform is over (only transforms futures and partial files are keep meanwhile)
+    #        -> legacy_key (raw hash of previous versions) is remove once, after the first run without error (so the
+    #           ref hash is fill), a marker key "meta:migrated:<legacy_key>" avoid to redo it at every start
+
+    def __init__(self, name, wdv, db, remote_dir, infos_key, raw_key, download_dir, transform=None, site_tag=None,
+                 exclude_ext=('.txt',), max_size=10 * 1024 * 1024, max_workers=4, transform_timeout=120.0,
+                 head_verify=False, blobs=None, legacy_key=None):
+        # public
+        self.name = name
+        self.wdv = wdv
+        self.db = db
+        self.remote_dir = remote_dir
+        self.infos_key = infos_key
+        self.raw_key = raw_key
+        self.download_dir = download_dir
+        self.transform = transform
+        self.site_tag = site_tag
+        self.exclude_ext = exclude_ext
+        self.max_size = max_size
+        self.max_workers = max_workers
+        self.transform_timeout = transform_timeout
+        self.head_verify = head_verify
+        self.blobs = blobs
+        self.legacy_key = legacy_key
+        # private
+        self._lock = threading.Lock()
+        self._changes_d = {}
+        self._full_pending = False
+        self._legacy_done = legacy_key is None
+        # raw hash is a ref key of blob store
+        if self.blobs:
+            self.blobs.ref_keys.add(raw_key)
+
+    @classmethod
+    def owncloud_syncs(cls, wdv, db, carousel_dir, doc_dir, site_tag, cpu_pool, cache_dir='/data/cache',
+                       max_size=10 * 1024 * 1024):
+        # carousel and document directories syncs of an import app, return (carousel sync, doc sync)
+        # WARNs: -> raw content is in a blob store share by both syncs (large files like PDF are store as chunks),
+        #           directory hashes of previous versions are remove after a first sync without error (legacy_key)
+        #        -> carousel thumbnails conversion cache and partial downloads are in cache_dir (partial downloads
+        #           go to a temporary directory if it's not writable)
+        download_dir = os.path.join(cache_dir, 'downloads')
+        try:
+            os.makedirs(download_dir, exist_ok=True)
+        except OSError:
+            download_dir = tempfile.mkdtemp(prefix='board-downloads-')
+        conv_cache = FileCache(os.path.join(cache_dir, 'carousel'), max_size=128 * 1024 * 1024)
+        blob_store = BlobStore(db, chunk_size=BlobStore.CHUNK_SIZE)
+        car_sync = cls('carousel', wdv, db, carousel_dir, infos_key='dir:carousel:infos',
+                       raw_key='dir:carousel:ref:min-png', download_dir=download_dir,
+                       transform=CarouselTransform(cpu_pool, conv_cache), site_tag=site_tag, max_size=max_size,
+                       head_verify=True, blobs=blob_store, legacy_key='dir:carousel:raw:min-png')
+        doc_sync = cls('doc', wdv, db, doc_dir, infos_key='dir:doc:infos', raw_key='dir:doc:ref',
+                       download_dir=download_dir, max_size=max_size, head_verify=True, blobs=blob_store,
+                       legacy_key='dir:doc:raw')
+        return car_sync, doc_sync
+
+    @property
+    def is_pending(self):
+        # True if some changes (or a full sync) are queue for next run
+        with self._lock:
+            return self._full_pending or bool(self._changes_d)
+
+    def is_file_ok(self, file_name, size):
+        # download filter: ignore excluded extensions, heavy file or site tags mismatch
+        if file_name.lower().endswith(self.exclude_ext) or size > self.max_size:
+            return False
+        if self.site_tag:
+            # search site only tags (_@loos_, _@messein_...) in file name, site id is 16 chars max
+            site_tag_l = [s.strip().lower() for s in re.findall(r'_@([a-zA-Z0-9\-]{1,16})', file_name)]
+            return self.site_tag in site_tag_l or not site_tag_l
+        return True
+
+    def push_changes(self, items_l, full=False):
+        # queue items of WebDAV.sync_collection() (path relative to WebDAV root) that belong to remote_dir
+        # a full listing (first sync) queue a full sync
+        with self._lock:
+            if full:
+                self._full_pending = True
+                self._changes_d.clear()
+                return
+            for item in items_l:
+                file_name = item['file_path'][len(self.remote_dir):]
+                # keep only files at directory top level
+                if item['file_path'].startswith(self.remote_dir) and file_name and '/' not in file_name:
+                    self._changes_d[file_name] = item
+
+    def run(self, dry_run=False):
+        # sync remote directory (pending changes or full), return a stats dict
+        # with dry_run, only the change detection step is done (and time)
+        t_start = time.monotonic()
+        # pop pending changes (keep them for a dry run)
+        with self._lock:
+            changes_d = None if self._full_pending or not self._changes_d else dict(self._changes_d)
+            if not dry_run:
+                self._changes_d = {}
+                self._full_pending = False
+        # change detection
+        if changes_d is None:
+            remove_l, sync_d, refresh_d = self._plan_full()
+        else:
+            remove_l, sync_d, refresh_d = self._plan_delta(changes_d)
+        stats_d = dict(mode='full' if changes_d is None else 'delta', removed=len(remove_l), updated=len(sync_d),
+                       refreshed=len(refresh_d), errors=0, plan_s=round(time.monotonic() - t_start, 3))
+        logging.info(f'sync "{self.name}" ({stats_d["mode"]}): {len(remove_l)} file(s) to remove, '
+                     f'{len(sync_d)} to update (change detection in {stats_d["plan_s"]:.3f}s)')
+        if dry_run:
+            for file_name in remove_l:
+                logging.info(f'sync "{self.name}" (dry run): remove "{file_name}"')
+            for file_name in sync_d:
+                logging.info(f'sync "{self.name}" (dry run): update "{file_name}"')
+            for file_name in refresh_d:
+                logging.info(f'sync "{self.name}" (dry run): refresh manifest of "{file_name}"')
+            return stats_d
+        # remove
+        pipe = self.db.pipeline()
+        for file_name in remove_l:
+            logging.info(f'sync "{self.name}": remove "{file_name}"')
+            pipe.hdel(self.infos_key, file_name)
+            pipe.hdel(self.raw_key, file_name)
+        # unchanged files with new validators (etag, mtime): only update manifest
+        for file_name, manifest_d in refresh_d.items():
+            pipe.hset(self.infos_key, file_name, json.dumps(manifest_d))
+        pipe.execute()
+        # download files in parallel, transform and write each one as soon as its transfer is over
+        dl_items_l = [dict(name=file_name, file_path=os.path.join(self.remote_dir, file_name),
+                           dest=self._part_path(file_name), size=item['content_length'], if_range=item.get('etag'))
+                      for file_name, item in sync_d.items()]
+        pending_l = []
+        keep_parts_l = []
+        for dl_item, dl_infos_d, dl_err in self.wdv.download_many(dl_items_l, max_workers=self.max_workers,
+                                                                  max_size=self.max_size):
+            file_name = dl_item['name']
+            if dl_err:
+                logging.warning(f'sync "{self.name}": "{file_name}" download error ({dl_err}) -> skip it')
+                stats_d['errors'] += 1
+                keep_parts_l.append(dl_item['dest'])
+                continue
+            remote_item = sync_d[file_name]
+            manifest_d = dict(size=dl_infos_d['size'], md5=dl_infos_d['md5'], etag=remote_item.get('etag'),
+                              mtime=self._mtime(remote_item))
+            if self.transform:
+                result = self.transform(file_name, dl_item['dest'], manifest_d)
+            else:
+                with open(dl_item['dest'], 'rb') as f:
+                    result = f.read()
+            if isinstance(result, Future):
+                pending_l.append((result, file_name, manifest_d, dl_item['dest']))
+            else:
+                os.remove(dl_item['dest'])
+                self._write(file_name, manifest_d, result)
+            # write transforms over meanwhile
+            pending_l = self._write_done(pending_l, stats_d)
+        # wait last transforms
+        t_end = time.monotonic() + self.transform_timeout
+        while pending_l:
+            wait([future for future, *_ in pending_l], timeout=max(t_end - time.monotonic(), 0.0),
+                 return_when=FIRST_COMPLETED)
+            pending_l = self._write_done(pending_l, stats_d, expired=time.monotonic() >= t_end)
+        # blobs of removed or replaced files
+        if self.blobs and (remove_l or sync_d):
+            stats_d['blobs_removed'] = self.blobs.gc()
+        self._clean_parts(keep_parts_l)
+        # ref hash is now up to date: raw hash of previous versions is useless
+        if not self._legacy_done and not stats_d['errors']:
+            self._drop_legacy()
+        stats_d['total_s'] = round(time.monotonic() - t_start, 3)
+        logging.info(f'end of sync "{self.name}": {stats_d}')
+        return stats_d
+
+    def _write(self, file_name, manifest_d, raw_data):
+        # write an updated file (under blob store lock, see BlobStore)
+        logging.info(f'sync "{self.name}": update "{file_name}"')
+        with self.blobs.lock if self.blobs else contextlib.nullcontext():
+            pipe = self.db.pipeline()
+            pipe.hset(self.infos_key, file_name, json.dumps(manifest_d))
+            pipe.hset(self.raw_key, file_name, self.blobs.put(raw_data, pipe=pipe) if self.blobs else raw_data)
+            pipe.execute()
+
+    def _write_done(self, pending_l, stats_d, expired=False):
+        # write results of transforms that are over (with expired: the others are cancel as errors)
+        # return the still pending ones
+        still_pending_l = []
+        for future, file_name, manifest_d, part_path in pending_l:
+            if not future.done() and not expired:
+                still_pending_l.append((future, file_name, manifest_d, part_path))
+                continue
+            try:
+                raw_data = future.result(timeout=0)
+            except Exception as e:
+                future.cancel()
+                logging.warning(f'sync "{self.name}": "{file_name}" transform error ({e!r}) -> skip it')
+                stats_d['errors'] += 1
+                continue
+            finally:
+                os.remove(part_path)
+            self._write(file_name, manifest_d, raw_data)
+        return still_pending_l
+
+    def _drop_legacy(self):
+        # remove legacy raw hash once (a redis error let it for next run)
+        marker_key = f'meta:migrated:{self.legacy_key}'
+        is_done = self.db.exists(marker_key)
+        if is_done is None:
+            return
+        if not is_done:
+            logging.info(f'sync "{self.name}": remove legacy hash "{self.legacy_key}"')
+            if self.db.unlink(self.legacy_key) is None or not self.db.set(marker_key, 1):
+                return
+        self._legacy_done = True
+
+    @staticmethod
+    def _mtime(item):
+        return int(item['dt_last_modified'].timestamp()) if item.get('dt_last_modified') else None
+
+    def _is_changed(self, file_name, manifest_d, item, refresh_d):
+        # compare remote item to local manifest: etag, then size and mtime, then md5 of a HEAD request (if allowed)
+        # refresh_d receive manifest of unchanged files with new validators (no download need)
+        if not manifest_d:
+            return True
+        if item.get('etag') and manifest_d.get('etag'):
+            return item['etag'] != manifest_d['etag']
+        if manifest_d.get('size') != item['content_length']:
+            return True
+        remote_mtime = self._mtime(item)
+        if manifest_d.get('mtime') and remote_mtime:
+            changed = manifest_d['mtime'] != remote_mtime
+        elif self.head_verify and manifest_d.get('md5'):
+            changed = self._head_md5(file_name) != manifest_d['md5']
+        else:
+            # can't tell: download it again (a transform cache keyed by md5 avoid its processing)
+            changed = True
+        # store validators missing in manifest
+        if not changed and (item.get('etag'), remote_mtime) != (manifest_d.get('etag'), manifest_d.get('mtime')):
+            refresh_d[file_name] = dict(manifest_d, etag=item.get('etag'), mtime=remote_mtime)
+        return changed
+
+    def _head_md5(self, file_name):
+        # md5 of remote file from a HEAD request (OwnCloud checksum header), None if unavailable
+        try:
+            return self.wdv.head(os.path.join(self.remote_dir, file_name))['checksums'].get('md5')
+        except Exception as e:
+            logging.debug(f'sync "{self.name}": HEAD of "{file_name}" error ({e})')
+            return None
+
+    def _plan_full(self):
+        # compare the full remote listing with manifest
+        # return (names to remove, {name to update: remote item}, {name to refresh: manifest})
+        # load manifest and check it against raw hash (orphan records are remove)
+        manifests_d = {}
+        for file_name, js_manifest in (self.db.hgetall(self.infos_key) or {}).items():
+            try:
+                manifests_d[file_name.decode()] = json.loads(js_manifest)
+            except ValueError:
+                manifests_d[file_name.decode()] = {}
+        raw_names_set = {file_name.decode() for file_name in (self.db.hkeys(self.raw_key) or [])}
+        remove_set = raw_names_set - set(manifests_d)
+        for file_name in set(manifests_d) - raw_names_set:
+            remove_set.add(file_name)
+            del manifests_d[file_name]
+        # remote listing (disallow directory)
+        remote_d = {}
+        for item in self.wdv.ls(self.remote_dir):
+            file_name = item['file_path']
+            if file_name and not file_name.endswith('/') and self.is_file_ok(file_name, item['content_length']):
+                remote_d[file_name] = item
+        remove_set |= set(manifests_d) - set(remote_d)
+        refresh_d = {}
+        sync_d = {n: item for n, item in remote_d.items() if self._is_changed(n, manifests_d.get(n), item, refresh_d)}
+        return sorted(remove_set), sync_d, refresh_d
+
+    def _plan_delta(self, changes_d):
+        # compare changed items only with their manifest
+        # return (names to remove, {name to update: remote item}, {name to refresh: manifest})
+        names_l = list(changes_d)
+        js_manifests_l = self.db.hmget(self.infos_key, names_l) or [None] * len(names_l)
+        remove_l = []
+        sync_d = {}
+        refresh_d = {}
+        for file_name, js_manifest in zip(names_l, js_manifests_l):
+            item = changes_d[file_name]
+            if item['removed'] or not self.is_file_ok(file_name, item['content_length']):
+                remove_l.append(file_name)
+                continue
+            try:
+                manifest_d = json.loads(js_manifest) if js_manifest else None
+            except ValueError:
+                manifest_d = None
+            if self._is_changed(file_name, manifest_d, item, refresh_d):
+                sync_d[file_name] = item
+        return remove_l, sync_d, refresh_d
+
+    def _part_path(self, file_name):
+        return os.path.join(self.download_dir, f'{self.name}-{hashlib.sha1(file_name.encode()).hexdigest()}.part')
+
+    def _clean_parts(self, keep_l=()):
+        # remove partial downloads of this sync, except the keep_l ones (resume at next run)
+        try:
+            for entry in os.scandir(self.download_dir):
+                if entry.name.startswith(f'{self.name}-') and entry.path not in keep_l:
+                    os.remove(entry.path)
+        except OSError as e:
+            logging.warning(f'sync "{self.name}": unable to clean partial downloads ({e})')
+
+
+class CarouselTransform:
+    # WebDAVSync transform of carousel files: file -> PNG thumbnail (bytes from conversion cache or a Future of CPU
+    # pool conversion)
+    # WARNs: -> thumbnail of the same content (whatever the file name) is reuse: cache key is md5 and size
+    #        -> a failed conversion is not store: WebDAVSync skip its write and next sync retry it
+
+    def __init__(self, cpu_pool, conv_cache, size=(655, 453)):
+        # public
+        self.cpu_pool = cpu_pool
+        self.conv_cache = conv_cache
+        self.size = size
+
+    def __call__(self, file_name, file_path, manifest_d):
+        # board_parsers import board_lib: import it here (at first call)
+        from board_parsers import carousel_png
+
+        cache_key = f'{manifest_d["md5"]}-{self.size[0]}x{self.size[1]}.png'
+        png_data = self.conv_cache.get(cache_key)
+        if png_data:
+            logging.debug(f'"{file_name}" thumbnail load from conversion cache')
+            return png_data
+
+        def on_done(future):
+            if not future.cancelled() and future.exception() is None:
+                self.conv_cache.set(cache_key, future.result())
+
+        future = self.cpu_pool.submit(carousel_png, file_name, file_path, size=self.size)
+        future.add_done_callback(on_done)
+        return future
+
+
+class CpuPool:
+    # process pool for CPU heavy transforms (PIL, pdf2image, WordCloud): they run out of the GIL of jobs threads
+    # WARNs: -> func must be a top level function of an importable module (like board_parsers), its args and result
+    #           must be picklable (bytes, str, dict...)
+    #        -> workers are start by a forkserver (not fork): a fork of the multi-threaded import app can inherit a
+    #           locked lock (redis, logging...)
+    #        -> pool is sized to the host CPU count and start at first submit
+    #        -> with mem_limit (in bytes), address space of every worker (and of its subprocess like poppler) is cap:
+    #           an allocation above it raise a MemoryError in the worker (not an OOM kill of the app)
+
+    def __init__(self, workers=None, preload=('board_parsers',), mem_limit=None):
+        # public
+        self.workers = workers or os.cpu_count() or 1
+        self.mem_limit = mem_limit
+        # private
+        self._ctx = multiprocessing.get_context('forkserver')
+        self._ctx.set_forkserver_preload(list(preload))
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        # submit func(*args, **kwargs) to the pool, return a future
+        # a broken pool (a worker kill by the OOM killer or a crash) is replace by a new one
+        with self._lock:
+            if self._pool is not None:
+                try:
+                    return self._pool.submit(func, *args, **kwargs)
+                except BrokenProcessPool:
+                    logging.warning('CPU pool is broken (a worker terminated abruptly): restart it')
+                    self._pool.shutdown(wait=False)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._ctx,
+                                             initializer=_cpu_pool_init, initargs=(self.mem_limit,))
+            return self._pool.submit(func, *args, **kwargs)
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        # run func(*args, **kwargs) in the pool and wait for its result (raise TimeoutError after timeout s)
+        return self.submit(func, *args, **kwargs).result(timeout=timeout)
+
+
+class JobExecutor:
+    # run scheduled jobs on bounded thread pools (instead of the schedule main loop thread)
+    # WARNs: -> a job is never run twice at the same time: a new run is skip if the previous one is not over
+    #        -> CPU heavy jobs have their own lane, so they can't delay IO jobs (and vice versa)
+    #        -> deadline (in s) start at submit time: a job still in queue at deadline is drop, a running job
+    #           can't be stop (it's a thread) so an overrun is only log (one time) as a warning
+    #        -> with a JobMetrics instance, every job run is measure
+
+    def __init__(self, io_workers=4, cpu_workers=1, metrics=None):
+        # public
+        self.metrics = metrics
+        # private
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='io-lane')
+        self._cpu_pool = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix='cpu-lane')
+        self._lock = threading.Lock()
+        self._running_d = {}
+        # start deadline watchdog
+        threading.Thread(target=self._watchdog_task, daemon=True).start()
+
+    def run(self, job, cpu=False, deadline=None):
+        # submit a job, can be call by schedule: schedule.every(5).minutes.do(executor.run, my_job, deadline=60.0)
+        name = job.__name__
+        with self._lock:
+            if name in self._running_d:
+                logging.debug(f'skip {name}: previous run is not over')
+                return None
+            dl_mono = time.monotonic() + deadline if deadline else None
+            self._running_d[name] = dict(deadline=dl_mono, submit=time.monotonic(), started=False, overrun=False)
+        pool = self._cpu_pool if cpu else self._io_pool
+        return pool.submit(self._job_task, name, job)
+
+    def warm_up(self, io_jobs, cpu_jobs=(), timeout=30.0):
+        # run first call of all jobs at once, wait for them until timeout (in s)
+        # return a readiness dict {job name: 'ok'|'error'|'timeout'}
+        t_start = time.monotonic()
+        jobs_futures_l = [(job, self.run(job)) for job in io_jobs]
+        jobs_futures_l += [(job, self.run(job, cpu=True)) for job in cpu_jobs]
+        wait([f for _, f in jobs_futures_l if f], timeout=timeout)
+        # readiness summary
+        ready_d = {}
+        for job, future in jobs_futures_l:
+            if future is None or not future.done():
+                ready_d[job.__name__] = 'timeout'
+            elif future.exception() or getattr(job, 'last_except', None):
+                ready_d[job.__name__] = 'error'
+            else:
+                ready_d[job.__name__] = 'ok'
+            logging.info(f'warm-up: {job.__name__} is {ready_d[job.__name__]}')
+        nb_ok = list(ready_d.values()).count('ok')
+        logging.info(f'warm-up end in {time.monotonic() - t_start:.1f}s ({nb_ok}/{len(ready_d)} jobs ok)')
+        return ready_d
+
+    def _job_task(self, name, job):
+        try:
+            with self._lock:
+                job_d = self._running_d[name]
+                # drop job if deadline is reached before it start
+                if job_d['deadline'] and time.monotonic() > job_d['deadline']:
+                    logging.warning(f'drop {name}: deadline reached before start')
+                    return None
+                job_d['started'] = True
+                lag = time.monotonic() - job_d['submit']
+            return self.metrics.run(job, lag=lag) if self.metrics else job()
+        finally:
+            with self._lock:
+                del self._running_d[name]
+
+    def _watchdog_task(self):
+        # log running jobs that overrun their deadline
+        while True:
+            with self._lock:
+                for name, job_d in self._running_d.items():
+                    if job_d['started'] and not job_d['overrun'] \
+                            and job_d['deadline'] and time.monotonic() > job_d['deadline']:
+                        job_d['overrun'] = True
+                        logging.warning(f'{name} overrun its deadline')
+            time.sleep(1.0)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+# parsing/transform half of import jobs: pure functions (no network, no redis), so they can be bench with
+# recorded payloads (see utils/bench_parsers.py) and run in a CpuPool process (args and result are picklable)
+
+from collections import Counter
+from datetime import datetime, timedelta
+import functools
+import io
+import random
+import re
+from xml.etree import ElementTree
+import feedparser
+from metar.Metar import Metar
+import PIL.Image
+import PIL.ImageDraw
+import PIL.ImageFont
+import pytz
+from board_lib import dt_utc_to_local
+
+# some const
+# seed of word cloud layout (fixed for a deterministic render)
+WORD_CLOUD_SEED = 42
+
+# some var
+# WordCloud instances by (width, height)
+_word_cloud_d = {}
+
+
+# some class
+class _WordCloudFont:
+    # PIL.ImageFont for wordcloud module: a truetype font is load once by (path, size) in this process
+    TransposedFont = PIL.ImageFont.TransposedFont
+    truetype = staticmethod(functools.lru_cache(maxsize=512)(PIL.ImageFont.truetype))
+
+
+# some function
+def carousel_png(filename, data, size=(655, 453), pdf_timeout=30):
+    # carousel file (PNG, JPG or PDF as bytes or as a local file path) -> PNG thumbnail (bytes)
+    # WARNs: -> pdf2image package is only install in images that need it (import at first call)
+    #        -> only the first page of a PDF is render, directly at the thumbnail size (poppler scale its long side
+    #           to max(size)), the render is abort after pdf_timeout s
+    #        -> a conversion error raise (never keep a result for this file: next sync retry it)
+    import pdf2image
+
+    # convert png and jpg file
+    if filename.lower().endswith('.png') or filename.lower().endswith('.jpg'):
+        # image to PIL (a JPEG is decode at the nearest scale above thumbnail size)
+        img = PIL.Image.open(io.BytesIO(data) if isinstance(data, bytes) else data)
+        img.draft('RGB', size)
+    # convert pdf file
+    elif filename.lower().endswith('.pdf'):
+        # PDF to PIL: convert first page to PIL image
+        convert = pdf2image.convert_from_bytes if isinstance(data, bytes) else pdf2image.convert_from_path
+        img = convert(data, first_page=1, last_page=1, single_file=True, size=max(size), timeout=pdf_timeout)[0]
+    else:
+        raise ValueError(f'unsupported file type (src: "{filename}")')
+    # resize and format as raw png
+    img.thumbnail(size)
+    img_io = io.BytesIO()
+    img.save(img_io, format='PNG')
+    return img_io.getvalue()
+
+
+def dir_est_png(raw_data, label, size=(224, 235)):
+    # DIR-est webcam image (bytes) -> PNG thumbnail with a label (bytes)
+    # load image to PIL and resize it
+    img = PIL.Image.open(io.BytesIO(raw_data))
+    img.thumbnail(size)
+    # add text to image
+    font = load_font('/usr/share/fonts/truetype/freefont/FreeMono.ttf', 16)
+    draw = PIL.ImageDraw.Draw(img)
+    draw.text((5, 5), label, (0x10, 0x0e, 0x0e), font=font)
+    # save image as PNG for redis
+    img_io = io.BytesIO()
+    img.save(img_io, format='PNG')
+    return img_io.getvalue()
+
+
+@functools.lru_cache(maxsize=8)
+def load_font(path, size):
+    # truetype font load once by process (fonts are read only for PIL draw)
+    return PIL.ImageFont.truetype(path, size)
+
+
+def parse_atmo_zones(atmo_raw_d, today_dt_date=None):
+    # arcgis atmo json -> dict {code_zone: today air quality code}
+    if today_dt_date is None:
+        today_dt_date = datetime.today().date()
+    zones_d = {}
+    for record in atmo_raw_d['features']:
+        # load record data
+        r_code_zone = record['attributes']['code_zone']
+        r_ts = int(record['attributes']['date_ech'])
+        r_dt = datetime.utcfromtimestamp(r_ts / 1000)
+        r_value = record['attributes']['code_qual']
+        # retain today value
+        if r_dt.date() == today_dt_date:
+            zones_d[r_code_zone] = r_value
+    return zones_d
+
+
+def parse_metar_today(metar_txt):
+    # NOAA METAR station file (first line is date, second is the message) -> today weather dict
+    # extract METAR message
+    metar_msg = metar_txt.split('\n')[1]
+    # METAR parse
+    obs = Metar(metar_msg)
+    # init and populate d_today dict
+    d_today = {}
+    # message date and time
+    if obs.time:
+        d_today['update_iso'] = obs.time.strftime('%Y-%m-%dT%H:%M:%SZ')
+        d_today['update_fr'] = dt_utc_to_local(obs.time).strftime('%H:%M %d/%m')
+    # current temperature
+    if obs.temp:
+        d_today['temp'] = round(obs.temp.value('C'))
+    # current dew point
+    if obs.dewpt:
+        d_today['dewpt'] = round(obs.dewpt.value('C'))
+    # current pressure
+    if obs.press:
+        d_today['press'] = round(obs.press.value('hpa'))
+    # current wind speed
+    if obs.wind_speed:
+        d_today['w_speed'] = round(obs.wind_speed.value('KMH'))
+    # current wind gust
+    if obs.wind_gust:
+        d_today['w_gust'] = round(obs.wind_gust.value('KMH'))
+    # current wind direction
+    if obs.wind_dir:
+        # replace 'W'est by 'O'uest
+        d_today['w_dir'] = obs.wind_dir.compass().replace('W', 'O')
+    # weather status str
+    d_today['descr'] = 'n/a'
+    return d_today
+
+
+def parse_owm_forecast(ow_d, now_dt=None):
+    # openweathermap 5 days forecast json -> dict {day index: forecast dict}
+    if now_dt is None:
+        now_dt = datetime.now()
+    t_today = None
+    d_days = {}
+    for i in range(0, 5):
+        d_days[i] = dict(t_min=50.0, t_max=-50.0, main='', description='', icon='')
+    # parse json
+    for item in ow_d['list']:
+        # for day-0 to day-4
+        for i_day in range(5):
+            txt_date, txt_time = item['dt_txt'].split(' ')
+            # search today
+            if txt_date == (now_dt + timedelta(days=i_day)).date().strftime('%Y-%m-%d'):
+                # search min/max temp
+                d_days[i_day]['t_min'] = min(d_days[i_day]['t_min'], item['main']['temp_min'])
+                d_days[i_day]['t_max'] = max(d_days[i_day]['t_max'], item['main']['temp_max'])
+                # main and icon in 12h item
+                if txt_time == '12:00:00' or t_today is None:
+                    d_days[i_day]['main'] = item['weather'][0]['main']
+                    d_days[i_day]['icon'] = item['weather'][0]['icon']
+                    d_days[i_day]['description'] = item['weather'][0]['description']
+                    if t_today is None:
+                        t_today = item['main']['temp']
+                        d_days[0]['t'] = t_today
+    return d_days
+
+
+def parse_rss_titles(rss_raw):
+    # RSS feed (bytes) -> list of items titles
+    l_titles = []
+    for post in feedparser.parse(rss_raw).entries:
+        title = post.title
+        title = title.strip()
+        title = title.replace('\n', ' ')
+        l_titles.append(title)
+    return l_titles
+
+
+def parse_vigilance(xml_raw, departments=None):
+    # Météo-France vigilance XML (raw bytes) -> dict {'update': iso date, 'department': {dep code: levels dict}}
+    # streaming parse: only departments in departments iterable are kept (all if None)
+    if departments is not None:
+        departments = set(departments)
+    vig_data = {'update': '', 'department': {}}
+    root = None
+    for event, elem in ElementTree.iterparse(io.BytesIO(xml_raw), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+        # map build date
+        if elem.tag == 'entetevigilance':
+            map_date = elem.get('dateinsert')
+            map_dt = pytz.timezone('Europe/Paris').localize(datetime(int(map_date[0:4]), int(map_date[4:6]),
+                                                                     int(map_date[6:8]), int(map_date[8:10]),
+                                                                     int(map_date[10:12])))
+            vig_data['update'] = map_dt.isoformat()
+        # current department
+        elif elem.tag == 'datavigilance':
+            dep_code = elem.get('dep')
+            if departments is None or dep_code in departments:
+                # get risk ID if exist
+                risk_id = [int(risk.get('valeur')) for risk in elem.iter('risque')]
+                # get flood ID if exist
+                flood_id = None
+                for flood in elem.iter('crue'):
+                    flood_id = int(flood.get('valeur'))
+                # build vig_data
+                vig_data['department'][dep_code] = {'vig_level': int(elem.get('couleur')),
+                                                    'flood_level': flood_id,
+                                                    'risk_id': risk_id}
+            # free memory of processed department (and its reference in root)
+            elem.clear()
+            root.clear()
+    return vig_data
+
+
+def tw_hashtags_freq(tweets_d, most_common=25):
+    # twitter search json -> dict {hashtag (camelcase if available): score} of the most common hashtags
+    def is_camelcase(s):
+        return s != s.lower() and '_' not in s
+
+    d_hash_camel = {}
+    c_hash = Counter()
+    for tw in tweets_d['statuses']:
+        tw_msg = tw['full_text']
+        # search hashtag and count it
+        for hashtag in re.findall(r'#(\w+)', tw_msg):
+            h_key = hashtag.lower()
+            if is_camelcase(hashtag):
+                d_hash_camel[h_key] = hashtag
+            elif h_key not in d_hash_camel:
+                d_hash_camel[h_key] = h_key
+            c_hash.update([h_key])
+    # build frequencies dict for generate step
+    d_freq = {}
+    for h_key, score in c_hash.most_common(most_common):
+        d_freq[d_hash_camel[h_key]] = score
+    return d_freq
+
+
+def word_cloud_png(d_freq, width=327, height=226):
+    # hashtags frequencies dict -> word cloud as RAW PNG (bytes)
+    # WARNs: -> wordcloud package is only install in images that need it (import at first call)
+    #        -> WordCloud instance is keep between calls (in this process) with its fonts preload: the layout try
+    #           many font sizes for every word and wordcloud load the font file again at each try (see _WordCloudFont)
+    #        -> layout use a new random state seed with WORD_CLOUD_SEED at every call (WordCloud instance turn its
+    #           random_state into a single Random object): the same frequencies always give the same image
+    #        -> the cloud is render on the whole canvas (no mask, so no mask state to keep)
+    import wordcloud.wordcloud
+    from wordcloud import WordCloud
+
+    wordcloud.wordcloud.ImageFont = _WordCloudFont
+    word_cloud = _word_cloud_d.get((width, height))
+    if word_cloud is None:
+        word_cloud = WordCloud(margin=5, width=width, height=height)
+        _word_cloud_d[(width, height)] = word_cloud
+    word_cloud.random_state = random.Random(WORD_CLOUD_SEED)
+    word_cloud.generate_from_frequencies(frequencies=d_freq)
+    img_io = io.BytesIO()
+    pil_img = word_cloud.to_image()
+    pil_img.save(img_io, format='PNG')
+    return img_io.getvalue()
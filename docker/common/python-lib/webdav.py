@@ -1,7 +1,13 @@
-from xml.dom import minidom
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+import hashlib
+import threading
 import urllib3
 import urllib.parse
-import dateutil.parser
 import requests
 
 # TODO remove this
@@ -13,9 +19,33 @@ HASH_BUF_SIZE = 64 * 1024
 HTTP_OK = 200
 HTTP_CREATED = 201
 HTTP_NO_CONTENT = 204
+HTTP_PARTIAL_CONTENT = 206
 HTTP_MULTI_STATUS = 207
+HTTP_BAD_REQUEST = 400
 HTTP_UNAUTHORIZED = 401
+HTTP_FORBIDDEN = 403
 HTTP_NOT_ALLOWED = 405
+HTTP_CONFLICT = 409
+HTTP_RANGE_NOT_SATISFIABLE = 416
+HTTP_NOT_IMPLEMENTED = 501
+DAV_NS = '{DAV:}'
+MONTHS_D = dict(Jan=1, Feb=2, Mar=3, Apr=4, May=5, Jun=6, Jul=7, Aug=8, Sep=9, Oct=10, Nov=11, Dec=12)
+
+
+# some function
+def rfc1123_to_dt(date_str):
+    # RFC 1123 date (like "Wed, 19 Oct 2022 08:12:31 GMT") -> aware datetime (UTC)
+    # fast path for the fixed format of HTTP dates, fallback to email.utils for any other RFC 2822 variant
+    try:
+        _, day, month, year, hms, tz = date_str.split()
+        if tz != 'GMT':
+            raise ValueError
+        hour, minute, second = hms.split(':')
+        return datetime(int(year), MONTHS_D[month], int(day), int(hour), int(minute), int(second),
+                        tzinfo=timezone.utc)
+    except (ValueError, KeyError):
+        dt = parsedate_to_datetime(date_str)
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
 
 
 # some class
@@ -23,6 +53,39 @@ class WebDAVError(Exception):
     pass
 
 
+class WebDAVRangeError(WebDAVError):
+    pass
+
+
+class WebDAVSizeError(WebDAVError):
+    pass
+
+
+class WebDAVSyncUnsupported(WebDAVError):
+    pass
+
+
+class _ByteBudget:
+    # bytes counter to limit in-flight bytes of concurrent transfers
+    def __init__(self, limit):
+        self.limit = limit
+        self._used = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, size):
+        with self._cond:
+            # a transfer above limit is allowed when nothing else is in flight
+            self._cond.wait_for(lambda: self._used == 0 or self._used + size <= self.limit)
+            self._used += size
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._used -= size
+                self._cond.notify_all()
+
+
 class WebDAV:
     def __init__(self, url, username='', password='', timeout=5.0):
         # public
@@ -62,6 +125,139 @@ class WebDAV:
             raise WebDAVError('Error during download of file "%s" (HTTP code is %i)' % (file_path,
                                                                                         self.last_http_code))
 
+    def download_stream(self, file_path, dest, max_size=None, offset=0, hashes_d=None, if_range=None):
+        # stream file content to dest by chunks of HASH_BUF_SIZE with on the fly hashing
+        # dest is a binary file object or a callable (like a redis APPEND of every chunk)
+        # return a dict with size and hex digests of content (md5 and sha256 by default, see hashes_d)
+        # WARNs: -> WebDAVSizeError is raise as soon as size exceed max_size (dest is partially written)
+        #        -> with offset > 0 the transfer is resume at this position (HTTP Range): hashes_d must contain hash
+        #           objects already fed with the offset first bytes of the file
+        #        -> if_range (an ETag or HTTP date) avoid to resume a file changed since the first part: if server
+        #           send the whole file (HTTP 200), a file object dest is truncate and hashes are restart
+        if hashes_d is None:
+            hashes_d = dict(md5=hashlib.md5(), sha256=hashlib.sha256())
+        headers = {}
+        if offset:
+            headers['Range'] = 'bytes=%i-' % offset
+            if if_range:
+                headers['If-Range'] = if_range
+        # do request
+        r = self._session.request(method='GET', url=self._url_with_path(file_path), headers=headers,
+                                  timeout=self.timeout, verify=False, stream=True)
+        self.last_http_code = r.status_code
+        try:
+            # resume refused by server (file change or Range unsupported): restart from the beginning
+            if offset and r.status_code == HTTP_OK:
+                if callable(dest):
+                    raise WebDAVError('Error during download of file "%s" (unable to resume it)' % file_path)
+                dest.seek(0)
+                dest.truncate()
+                offset = 0
+                hashes_d = {name: hashlib.new(name) for name in hashes_d}
+            elif r.status_code == HTTP_RANGE_NOT_SATISFIABLE:
+                raise WebDAVRangeError('Error during download of file "%s" (unable to resume at %i)' % (file_path,
+                                                                                                        offset))
+            elif r.status_code != (HTTP_PARTIAL_CONTENT if offset else HTTP_OK):
+                raise WebDAVError('Error during download of file "%s" (HTTP code is %i)' % (file_path,
+                                                                                            self.last_http_code))
+            write = dest if callable(dest) else dest.write
+            # check announced size before transfer
+            size = offset
+            if max_size and offset + int(r.headers.get('Content-Length', 0)) > max_size:
+                raise WebDAVSizeError('File "%s" exceed max size of %i bytes' % (file_path, max_size))
+            # transfer
+            for chunk in r.iter_content(chunk_size=HASH_BUF_SIZE):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise WebDAVSizeError('File "%s" exceed max size of %i bytes' % (file_path, max_size))
+                for h in hashes_d.values():
+                    h.update(chunk)
+                write(chunk)
+        except requests.RequestException as e:
+            raise WebDAVError('Error during download of file "%s" (%s)' % (file_path, e))
+        finally:
+            r.close()
+        infos_d = dict(size=size)
+        infos_d.update({name: h.hexdigest() for name, h in hashes_d.items()})
+        return infos_d
+
+    def download_to_file(self, file_path, local_path, max_size=None, if_range=None):
+        # download file to local_path, resume a partial local_path left by a previous failed call (HTTP Range)
+        # return download_stream() dict
+        with open(local_path, 'ab+') as f:
+            # hash local part
+            hashes_d = dict(md5=hashlib.md5(), sha256=hashlib.sha256())
+            f.seek(0)
+            for chunk in iter(lambda: f.read(HASH_BUF_SIZE), b''):
+                for h in hashes_d.values():
+                    h.update(chunk)
+            offset = f.tell()
+            try:
+                return self.download_stream(file_path, f, max_size=max_size, offset=offset, hashes_d=hashes_d,
+                                            if_range=if_range)
+            except WebDAVSizeError:
+                f.truncate(0)
+                raise
+            except WebDAVRangeError:
+                # local part is not a prefix of remote file (like a remote file shrink): restart from the beginning
+                f.truncate(0)
+            return self.download_stream(file_path, f, max_size=max_size)
+
+    def download_many(self, items, max_workers=4, max_inflight=32 * 1024 * 1024, max_size=None):
+        # download several files concurrently (on the pooled session), yield (item, infos dict, exception) as soon
+        # as each transfer is over (infos dict or exception is None), so the caller can process it while the others
+        # files are still downloading
+        # items are dicts: file_path, dest (local path for download_to_file(), file object or callable for
+        # download_stream()), optional size (expected size, from ls) and if_range
+        # WARNs: -> at most max_workers parallel transfers and max_inflight expected bytes (a single file above
+        #           max_inflight is download alone)
+        #        -> last_http_code is meaningless after this call (it's update by every transfer thread)
+        budget = _ByteBudget(max_inflight)
+
+        def download_task(item):
+            size = item.get('size') or 0
+            with budget.reserve(size):
+                if isinstance(item['dest'], str):
+                    return self.download_to_file(item['file_path'], item['dest'], max_size=max_size,
+                                                 if_range=item.get('if_range'))
+                return self.download_stream(item['file_path'], item['dest'], max_size=max_size)
+
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='webdav-dl')
+        futures_d = {}
+        try:
+            futures_d = {pool.submit(download_task, item): item for item in items}
+            for future in as_completed(futures_d):
+                try:
+                    yield futures_d[future], future.result(), None
+                except (WebDAVError, OSError) as e:
+                    yield futures_d[future], None, e
+        finally:
+            # caller stop iteration: cancel queued transfers, wait running ones
+            # WARN: no shutdown(cancel_futures=True), it's not available before Python 3.9 (debian buster have 3.7)
+            for future in futures_d:
+                future.cancel()
+            pool.shutdown(wait=True)
+
+    def head(self, file_path):
+        # file metadata from HTTP headers (without content transfer): dict with etag, content_length,
+        # dt_last_modified and checksums
+        # checksums is a dict {algorithm: hex digest} from OwnCloud "OC-Checksum" header (like "SHA1:1f09... MD5:a1b2"),
+        # it's empty if the server doesn't send it
+        # do request
+        r = self._session.request(method='HEAD', url=self._url_with_path(file_path),
+                                  timeout=self.timeout, verify=False)
+        self.last_http_code = r.status_code
+        if r.status_code != HTTP_OK:
+            raise WebDAVError('Error during HEAD of file "%s" (HTTP code is %i)' % (file_path, self.last_http_code))
+        checksums_d = {}
+        for checksum in r.headers.get('OC-Checksum', '').split():
+            algorithm, _, digest = checksum.partition(':')
+            if digest:
+                checksums_d[algorithm.lower()] = digest.lower()
+        last_modified = r.headers.get('Last-Modified')
+        return dict(etag=r.headers.get('ETag'), content_length=int(r.headers.get('Content-Length', 0)),
+                    dt_last_modified=rfc1123_to_dt(last_modified) if last_modified else None, checksums=checksums_d)
+
     def delete(self, file_path):
         # do request
         r = self._session.request(method='DELETE', url=self._url_with_path(file_path),
@@ -83,48 +279,124 @@ class WebDAV:
                                                                                        self.last_http_code))
 
     def ls(self, path='', depth=1):
+        # generator of dict (one by item): file_path, content_length, dt_last_modified, etag and content_type
+        # WARNs: -> response body is parse while it is receive (no full copy of it): items are yield one by one
+        #        -> an HTTP error is raise at first iteration
         # build xml message
         propfind_request = '<?xml version="1.0" encoding="utf-8" ?>' \
                            '<d:propfind xmlns:d="DAV:">' \
-                           '<d:prop><d:getlastmodified/><d:getcontentlength/></d:prop> ' \
+                           '<d:prop><d:getlastmodified/><d:getcontentlength/>' \
+                           '<d:getetag/><d:getcontenttype/></d:prop> ' \
                            '</d:propfind>'
         # do request
         r = self._session.request(method='PROPFIND',
                                   url=self._url_with_path(path),
                                   data=propfind_request, headers={'Depth': '%i' % depth},
-                                  timeout=self.timeout, verify=False)
+                                  timeout=self.timeout, verify=False, stream=True)
         self.last_http_code = r.status_code
-        # check result
-        if self.last_http_code == HTTP_MULTI_STATUS:
-            # return a list of dict
-            results_l = []
-            # parse XML
-            dom = minidom.parseString(r.text.encode('ascii', 'xmlcharrefreplace'))
-            # for every d:response
-            for response in dom.getElementsByTagName('d:response'):
-                # in d:response/d:propstat/d:prop
-                prop_stat = response.getElementsByTagName('d:propstat')[0]
-                prop = prop_stat.getElementsByTagName('d:prop')[0]
-                # d:getlastmodified
-                get_last_modified = prop.getElementsByTagName('d:getlastmodified')[0].firstChild.data
-                dt_last_modified = dateutil.parser.parse(get_last_modified)
-                # d:getcontentlength
-                try:
-                    content_length = int(prop.getElementsByTagName('d:getcontentlength')[0].firstChild.data)
-                except IndexError:
-                    content_length = 0
-                # href at d:response level
-                href = response.getElementsByTagName('d:href')[0].firstChild.data
-                # convert href to file path
-                if href.startswith(self._url):
-                    href = href[len(self._url):]
-                elif href.startswith(self._url_path):
-                    href = href[len(self._url_path):]
-                file_path = urllib.parse.unquote(href)
-                file_path = file_path[len(path):]
-                # feed result list
-                results_l.append(dict(file_path=file_path, content_length=content_length,
-                                      dt_last_modified=dt_last_modified))
-            return results_l
-        else:
-            raise WebDAVError("Error during PROPFIND (ls) request (HTTP code is %i)" % self.last_http_code)
+        try:
+            # check result
+            if self.last_http_code != HTTP_MULTI_STATUS:
+                raise WebDAVError('Error during PROPFIND (ls) request (HTTP code is %i)' % self.last_http_code)
+            # for every DAV:response
+            for elem in self._iter_multistatus(r):
+                if elem.tag == DAV_NS + 'response':
+                    yield self._ls_item(elem, path)
+        finally:
+            r.close()
+
+    def sync_collection(self, path='', sync_token='', level='infinite'):
+        # RFC 6578 sync-collection REPORT: return (new sync token, changed items, full)
+        # changed items are ls() dicts with an extra "removed" flag, full is True if items are a full listing
+        # (first call without sync_token or after an invalid/expired one)
+        # WARNs: -> raise WebDAVSyncUnsupported if server (or this collection) doesn't support sync-collection
+        #        -> raise WebDAVError on other HTTP errors (5xx, 401...): a transient error, retry it later
+        report_request = '<?xml version="1.0" encoding="utf-8" ?>' \
+                         '<d:sync-collection xmlns:d="DAV:">' \
+                         '<d:sync-token>%s</d:sync-token><d:sync-level>%s</d:sync-level>' \
+                         '<d:prop><d:getlastmodified/><d:getcontentlength/>' \
+                         '<d:getetag/><d:getcontenttype/></d:prop>' \
+                         '</d:sync-collection>' % (escape(sync_token or ''), level)
+        # do request
+        r = self._session.request(method='REPORT',
+                                  url=self._url_with_path(path),
+                                  data=report_request.encode(), headers={'Content-Type': 'application/xml'},
+                                  timeout=self.timeout, verify=False, stream=True)
+        self.last_http_code = r.status_code
+        try:
+            # token refused by server (invalid or expired): restart with an initial sync
+            if sync_token and self.last_http_code in (HTTP_FORBIDDEN, HTTP_CONFLICT) and 'valid-sync-token' in r.text:
+                r.close()
+                return self.sync_collection(path, sync_token='', level=level)
+            if self.last_http_code in (HTTP_BAD_REQUEST, HTTP_FORBIDDEN, HTTP_NOT_ALLOWED, HTTP_NOT_IMPLEMENTED):
+                raise WebDAVSyncUnsupported('sync-collection REPORT is not supported (HTTP code is %i)' %
+                                            self.last_http_code)
+            if self.last_http_code != HTTP_MULTI_STATUS:
+                raise WebDAVError('sync-collection REPORT error (HTTP code is %i)' % self.last_http_code)
+            new_token = None
+            items_l = []
+            for elem in self._iter_multistatus(r):
+                if elem.tag == DAV_NS + 'response':
+                    item = self._ls_item(elem, path)
+                    # a removed member have a 404 status at response level (and no propstat)
+                    status = elem.findtext(DAV_NS + 'status', default='')
+                    item['removed'] = status.split()[1:2] == ['404']
+                    items_l.append(item)
+                elif elem.tag == DAV_NS + 'sync-token':
+                    new_token = (elem.text or '').strip()
+            if not new_token:
+                raise WebDAVSyncUnsupported('sync-collection REPORT response without sync-token')
+            return new_token, items_l, not sync_token
+        finally:
+            r.close()
+
+    @staticmethod
+    def _iter_multistatus(r):
+        # generator of DAV:response and DAV:sync-token elements of a multistatus streamed response
+        # WARN: an element is clear (with its reference in root) after its processing by the caller
+        try:
+            # parse XML stream (decode gzip/deflate transfer encoding)
+            r.raw.decode_content = True
+            root = None
+            for event, elem in ElementTree.iterparse(r.raw, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                    continue
+                if elem.tag in (DAV_NS + 'response', DAV_NS + 'sync-token'):
+                    yield elem
+                    # free memory of processed item (and its reference in root)
+                    elem.clear()
+                    root.clear()
+        except ElementTree.ParseError as e:
+            raise WebDAVError('Error during multistatus response parse: %s' % e)
+
+    def _ls_item(self, response, path):
+        # DAV:response element -> item dict
+        # merge DAV:prop of every DAV:propstat with an OK status (missing props are in a 404 propstat)
+        props_d = {}
+        for prop_stat in response.iter(DAV_NS + 'propstat'):
+            status = prop_stat.findtext(DAV_NS + 'status', default='')
+            if status and status.split()[1:2] != ['200']:
+                continue
+            for prop in prop_stat.iter(DAV_NS + 'prop'):
+                for item in prop:
+                    props_d[item.tag[len(DAV_NS):]] = (item.text or '').strip()
+        # DAV:getlastmodified
+        dt_last_modified = rfc1123_to_dt(props_d['getlastmodified']) if props_d.get('getlastmodified') else None
+        # DAV:getcontentlength
+        try:
+            content_length = int(props_d['getcontentlength'])
+        except (KeyError, ValueError):
+            content_length = 0
+        # href at DAV:response level
+        href = response.findtext(DAV_NS + 'href', default='').strip()
+        # convert href to file path
+        if href.startswith(self._url):
+            href = href[len(self._url):]
+        elif href.startswith(self._url_path):
+            href = href[len(self._url_path):]
+        file_path = urllib.parse.unquote(href)
+        file_path = file_path[len(path):]
+        return dict(file_path=file_path, content_length=content_length, dt_last_modified=dt_last_modified,
+                    etag=props_d.get('getetag') or None, content_type=props_d.get('getcontenttype') or None)
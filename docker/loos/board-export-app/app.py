@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
-from board_lib import CustomRedis, catch_log_except
+from board_lib import CustomRedis, JobMetrics, catch_log_except
 from configparser import ConfigParser
 import logging
+import os
 import time
 import schedule
 
@@ -36,10 +37,13 @@ if __name__ == '__main__':
     logging.basicConfig(format='%(asctime)s %(message)s', level=logging.INFO)
     logging.info('board-export-app started')
 
+    # jobs metrics publish to redis hash "board:metrics:board-export-app" (and to a Prometheus textfile if set)
+    metrics = JobMetrics('board-export-app', db=DB.main, textfile=os.getenv('BOARD_METRICS_TEXTFILE'))
+
     # init scheduler
-    schedule.every(2).minutes.do(loos_redis_export_job)
+    schedule.every(2).minutes.do(metrics.run, loos_redis_export_job)
     # first call
-    loos_redis_export_job()
+    metrics.run(loos_redis_export_job)
 
     # main loop
     while True:
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
-from board_lib import catch_log_except
+from board_lib import CustomRedis, JobMetrics, catch_log_except
 from configparser import ConfigParser
 import logging
+import os
 import time
 from pyHMI.DS_ModbusTCP import ModbusTCPDevice
 from pyHMI.DS_Redis import RedisDevice
@@ -171,14 +172,21 @@ if __name__ == '__main__':
     # wait DS_ModbusTCP thread start
     time.sleep(1.0)
 
+    # jobs metrics publish to redis hash "board:metrics:board-meters-app" (and to a Prometheus textfile if set)
+    # WARN: db_refresh_job run every 5s, so metrics are publish once a minute (or when a job outcome change)
+    metrics_db = CustomRedis(host='board-redis-srv', username=redis_user, password=redis_pass,
+                             socket_timeout=4, socket_keepalive=True)
+    metrics = JobMetrics('board-meters-app', db=metrics_db, textfile=os.getenv('BOARD_METRICS_TEXTFILE'),
+                         publish_every=60.0)
+
     # init scheduler
-    schedule.every(5).seconds.do(db_refresh_job)
-    schedule.every().day.at('00:00').do(db_midnight_job)
-    schedule.every(2).minutes.do(web_publish_pwr_job)
-    schedule.every().day.at('06:00').do(web_publish_index_job)
+    schedule.every(5).seconds.do(metrics.run, db_refresh_job)
+    schedule.every().day.at('00:00').do(metrics.run, db_midnight_job)
+    schedule.every(2).minutes.do(metrics.run, web_publish_pwr_job)
+    schedule.every().day.at('06:00').do(metrics.run, web_publish_index_job)
     # first call
-    db_refresh_job()
-    web_publish_pwr_job()
+    metrics.run(db_refresh_job)
+    metrics.run(web_publish_pwr_job)
 
     # main loop
     while True:
@@ -3,35 +3,38 @@
 from configparser import ConfigParser
 from datetime import datetime
 import urllib.parse
-import hashlib
 import io
-import json
 import logging
 import os
-import re
+import sys
 import time
-from xml.dom import minidom
-import feedparser
-import requests
 import schedule
 import PIL.Image
-import PIL.ImageDraw
-import PIL.ImageFont
-from metar.Metar import Metar
-import pytz
-import pdf2image
-import PIL.Image
-import PIL.ImageDraw
-from board_lib import CustomRedis, catch_log_except, dt_utc_to_local
-from webdav import WebDAV
+from board_lib import CameraSource, CpuPool, CustomRedis, HttpClient, JobExecutor, JobMetrics, WebDAVSync, \
+    catch_log_except, scale_schedule, upstream_url
+from board_parsers import dir_est_png, parse_atmo_zones, parse_metar_today, parse_rss_titles, parse_vigilance
+from webdav import WebDAV, WebDAVSyncUnsupported
 
 
 # some const
 USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64; rv:2.0.1) Gecko/20100101 Firefox/4.0.1'
+# departments of vigilance map display by HMI
+VIGILANCE_DEPARTMENTS = ('54', '55', '57', '88', '67')
+# redis hash of WebDAV sync tokens (by WebDAV url)
+OWC_SYNC_TOKEN_KEY = 'owc:sync-token'
+# max size of owncloud files to sync
+OWC_MAX_FILE_SIZE = 10 * 1024 * 1024
+# default DIR-est webcams: (name, label, url)
+DIR_EST_CAMS = [('houdemont', 'Houdemont', 'https://webcam.dir-est.fr/app.php/lastimg/18'),
+                ('velaine', 'Velaine', 'https://webcam.dir-est.fr/app.php/lastimg/53'),
+                ('st-nicolas', 'Saint-Nicolas', 'https://webcam.dir-est.fr/app.php/lastimg/49'),
+                ('flavigny', 'Flavigny', 'https://webcam.dir-est.fr/app.php/lastimg/5')]
 
 # some var
 owc_doc_dir_last_sync = 0
 owc_car_dir_last_sync = 0
+# sync-collection REPORT support of owncloud server (disable at first unsupported reply)
+owc_sync_report_ok = True
 
 # read config
 cnf = ConfigParser()
@@ -54,6 +57,9 @@ webdav_user = cnf.get('owncloud_dashboard', 'webdav_user')
 webdav_pass = cnf.get('owncloud_dashboard', 'webdav_pass')
 webdav_reglement_doc_dir = cnf.get('owncloud_dashboard', 'webdav_reglement_doc_dir')
 webdav_carousel_img_dir = cnf.get('owncloud_dashboard', 'webdav_carousel_img_dir')
+# DIR-est webcams (optional section, default is Houdemont, Velaine-en-Haye, Saint-Nicolas, Côte de Flavigny)
+dir_est_cams = CameraSource.from_conf(cnf, 'dir_est_cams', key_fmt='img:dir-est:{name}:png',
+                                      defaults_l=DIR_EST_CAMS)
 
 
 # some class
@@ -65,6 +71,10 @@ class DB:
                        socket_timeout=4, socket_keepalive=True)
 
 
+# shared HTTP client (pooled keep-alive sessions) for all fetchers
+http_cli = HttpClient(timeout=5.0, user_agent=USER_AGENT, cache_db=DB.main)
+
+
 # some function
 @catch_log_except()
 def air_quality_atmo_ge_job():
@@ -74,24 +84,12 @@ def air_quality_atmo_ge_job():
           '&outFields=date_ech, code_qual, lib_qual, lib_zone, code_zone' + \
           '&returnGeometry=false&resultRecordCount=48' + \
           '&orderByFields=%s&f=json' % urllib.parse.quote('date_ech ASC')
-    today_dt_date = datetime.today().date()
-    # https request
-    r = requests.get(url, timeout=5.0)
+    # https request (an empty features list is report as a source failure)
+    r = http_cli.get(url, valid=lambda resp: resp.json().get('features'))
     # check error
     if r.status_code == 200:
-        # decode json message
-        atmo_raw_d = r.json()
-        # populate zones dict with receive values
-        zones_d = {}
-        for record in atmo_raw_d['features']:
-            # load record data
-            r_code_zone = record['attributes']['code_zone']
-            r_ts = int(record['attributes']['date_ech'])
-            r_dt = datetime.utcfromtimestamp(r_ts / 1000)
-            r_value = record['attributes']['code_qual']
-            # retain today value
-            if r_dt.date() == today_dt_date:
-                zones_d[r_code_zone] = r_value
+        # populate zones dict with today values
+        zones_d = parse_atmo_zones(r.json())
         # skip key publish if zones_d is empty
         if not zones_d:
             raise ValueError('dataset is empty')
@@ -101,280 +99,140 @@ def air_quality_atmo_ge_job():
                          'reims': zones_d.get(51454, 0),
                          'strasbourg': zones_d.get(67482, 0)}
         # update redis
-        DB.main.set_as_json('json:atmo', d_air_quality, ex=6 * 3600)
+        DB.main.set_as_json_if_changed('json:atmo', d_air_quality, ex=6 * 3600)
 
 
 @catch_log_except()
 def dir_est_img_job():
-    # retrieve DIR-est webcams: Houdemont, Velaine-en-Haye, Saint-Nicolas, Côte de Flavigny
-    for id_redis, lbl_cam, get_code in [('houdemont', 'Houdemont', '18'), ('velaine', 'Velaine', '53'),
-                                        ('st-nicolas', 'Saint-Nicolas', '49'), ('flavigny', 'Flavigny', '5')]:
-        r = requests.get('https://webcam.dir-est.fr/app.php/lastimg/%s' % get_code)
-        if r.status_code == 200:
-            # load image to PIL and resize it
-            img = PIL.Image.open(io.BytesIO(r.content))
-            img.thumbnail([224, 235])
-            # add text to image
-            txt_img = '%s - %s' % (lbl_cam, datetime.now().strftime('%H:%M'))
-            font = PIL.ImageFont.truetype('/usr/share/fonts/truetype/freefont/FreeMono.ttf', 16)
-            draw = PIL.ImageDraw.Draw(img)
-            draw.text((5, 5), txt_img, (0x10, 0x0e, 0x0e), font=font)
-            # save image as PNG for redis
-            redis_io = io.BytesIO()
-            img.save(redis_io, format='PNG')
-            # update redis
-            DB.main.set('img:dir-est:%s:png' % id_redis, redis_io.getvalue(), ex=3600)
+    # retrieve DIR-est webcams in parallel (only updated images)
+    resp_d = CameraSource.fetch_all(dir_est_cams, http_cli, ex=3600, deadline=20.0)
+    # resize images and add text to them (on CPU pool)
+    futures_d = {}
+    for cam, r in resp_d.items():
+        txt_img = '%s - %s' % (cam.label, datetime.now().strftime('%H:%M'))
+        futures_d[cam] = cpu_pool.submit(dir_est_png, r.content, txt_img)
+    png_d = {}
+    for cam, future in futures_d.items():
+        try:
+            png_d[cam] = future.result(timeout=60.0)
+        except Exception as e:
+            logging.warning(f'unable to convert "{cam.key}" image: {e!r}')
+    # update redis (one pipeline for all webcams), then validators of written (or unchanged) images
+    # WARN: on a write error, validators are not store: next run fetch and write these images again
+    if DB.main.mset_if_changed({cam.key: png for cam, png in png_d.items()}, ex=3600) is None:
+        raise RuntimeError('unable to write webcams images to redis')
+    for cam in png_d:
+        cam.store_validators(http_cli, resp_d[cam])
 
 
 @catch_log_except()
 def gsheet_job():
-    # https request
-    response = requests.get(gsheet_url, timeout=5.0)
+    # https request (skip it if unchanged since last run)
+    response = http_cli.get_if_modified(gsheet_url, key='json:gsheet', ex=2 * 3600)
+    if response is None:
+        return
     # process response
     d = dict()
     for line in response.iter_lines(decode_unicode=True):
         tag, value = line.split(',')
         d[tag] = value
     redis_d = dict(update=datetime.now().isoformat('T'), tags=d)
-    DB.main.set_as_json('json:gsheet', redis_d, ex=2 * 3600)
+    if DB.main.set_as_json('json:gsheet', redis_d, ex=2 * 3600):
+        http_cli.store_validators(gsheet_url, response)
 
 
 @catch_log_except()
 def img_gmap_traffic_job():
     # http request
-    r = requests.get(gmap_img_url, stream=True, timeout=5.0)
+    r = http_cli.get(gmap_img_url)
     if r.status_code == 200:
         # convert RAW img format (bytes) to Pillow image
-        pil_img = PIL.Image.open(io.BytesIO(r.raw.read()))
+        pil_img = PIL.Image.open(io.BytesIO(r.content))
         # crop image
         pil_img = pil_img.crop((0, 0, 560, 328))
         # pil_img.thumbnail([632, 328])
         img_io = io.BytesIO()
         pil_img.save(img_io, format='PNG')
         # store RAW PNG to redis key
-        DB.main.set('img:traffic-map:png', img_io.getvalue(), ex=2 * 3600)
+        DB.main.set_if_changed('img:traffic-map:png', img_io.getvalue(), ex=2 * 3600)
 
 
 @catch_log_except()
 def local_info_job():
-    # do request
-    l_titles = []
-    for post in feedparser.parse('https://france3-regions.francetvinfo.fr/societe/rss?r=grand-est').entries:
-        title = post.title
-        title = title.strip()
-        title = title.replace('\n', ' ')
-        l_titles.append(title)
-    DB.main.set_as_json('json:news', l_titles, ex=2 * 3600)
+    # do request (skip it if unchanged since last run)
+    rss_url = 'https://france3-regions.francetvinfo.fr/societe/rss?r=grand-est'
+    r = http_cli.get_if_modified(rss_url, key='json:news', ex=2 * 3600)
+    if r is None:
+        return
+    l_titles = parse_rss_titles(r.content)
+    if DB.main.set_as_json_if_changed('json:news', l_titles, ex=2 * 3600) is not None:
+        http_cli.store_validators(rss_url, r)
 
 
 @catch_log_except()
 def owc_updated_job():
     # check if the owncloud directories has been updated by users (start sync jobs if need)
-    global owc_doc_dir_last_sync, owc_car_dir_last_sync
+    # WARN: with sync-collection REPORT support, only changed files are sync (one small request when unchanged),
+    #       otherwise a full sync of updated directories is done (by compare of directories mtime)
+    global owc_doc_dir_last_sync, owc_car_dir_last_sync, owc_sync_report_ok
 
+    # delta listing since last sync token (a transient error, like an HTTP 503, only fail this run)
+    if owc_sync_report_ok:
+        try:
+            sync_token = DB.main.hget(OWC_SYNC_TOKEN_KEY, webdav_url)
+            sync_token = sync_token.decode() if sync_token else ''
+            sync_token, items_l, full = wdv.sync_collection(sync_token=sync_token)
+        except WebDAVSyncUnsupported as e:
+            logging.info(f'owncloud delta listing is unavailable ({e}): use directories mtime check')
+            owc_sync_report_ok = False
+        else:
+            # start sync jobs with pending changes (a job skip by executor will be restart at next call)
+            for owc_sync, job in ((owc_doc_sync, owc_sync_doc_job), (owc_car_sync, owc_sync_carousel_job)):
+                owc_sync.push_changes(items_l, full=full)
+                if owc_sync.is_pending:
+                    logging.debug(f'"{owc_sync.remote_dir}" have pending changes: run "{job.__name__}"')
+                    executor.run(job)
+            DB.main.hset(OWC_SYNC_TOKEN_KEY, webdav_url, sync_token)
+            return
+
+    # fallback: full sync of directories updated since last check
     for f in wdv.ls():
         item = f['file_path']
-        item_last_modified = int(f['dt_last_modified'].timestamp())
+        # directory stamp: last modified date or, if server don't send it, etag (skip item without both)
+        if f['dt_last_modified']:
+            item_stamp = int(f['dt_last_modified'].timestamp())
+        else:
+            item_stamp = f.get('etag')
+        if not item_stamp:
+            continue
         # document update ?
         if item == webdav_reglement_doc_dir:
             # update need
-            if item_last_modified > owc_doc_dir_last_sync:
+            if item_stamp != owc_doc_dir_last_sync:
                 logging.debug(f'"{webdav_reglement_doc_dir}" seem updated: run "owncloud_sync_doc_job"')
-                owc_sync_doc_job()
-                owc_doc_dir_last_sync = item_last_modified
+                # a sync still running skip this run: keep previous stamp to retry at next check
+                if executor.run(owc_sync_doc_job) is not None:
+                    owc_doc_dir_last_sync = item_stamp
         # carousel update ?
         elif item == webdav_carousel_img_dir:
             # update need
-            if item_last_modified > owc_car_dir_last_sync:
+            if item_stamp != owc_car_dir_last_sync:
                 logging.debug(f'"{webdav_carousel_img_dir}" seem updated: run "owncloud_sync_carousel_job"')
-                owc_sync_carousel_job()
-                owc_car_dir_last_sync = item_last_modified
+                # a sync still running skip this run: keep previous stamp to retry at next check
+                if executor.run(owc_sync_carousel_job) is not None:
+                    owc_car_dir_last_sync = item_stamp
 
 
 @catch_log_except()
 def owc_sync_carousel_job():
-    # sync owncloud carousel directory with local
-    # local constants
-    DIR_CAR_INFOS = 'dir:carousel:infos'
-    DIR_CAR_RAW = 'dir:carousel:raw:min-png'
-
-    # local functions
-    def update_carousel_raw_data(filename, raw_data):
-        # build json infos record
-        md5 = hashlib.md5(raw_data).hexdigest()
-        js_infos = json.dumps(dict(size=len(raw_data), md5=md5))
-        # convert raw data to PNG thumbnails
-        # create default error image
-        img_to_redis = PIL.Image.new('RGB', (655, 453), (255, 255, 255))
-        draw = PIL.ImageDraw.Draw(img_to_redis)
-        draw.text((0, 0), f'loading error (src: "{filename}")', (0, 0, 0))
-        # replace default image by convert result
-        try:
-            # convert png and jpg file
-            if filename.lower().endswith('.png') or filename.lower().endswith('.jpg'):
-                # image to PIL
-                img_to_redis = PIL.Image.open(io.BytesIO(raw_data))
-            # convert pdf file
-            elif filename.lower().endswith('.pdf'):
-                # PDF to PIL: convert first page to PIL image
-                img_to_redis = pdf2image.convert_from_bytes(raw_data)[0]
-        except Exception:
-            pass
-        # resize and format as raw png
-        img_to_redis.thumbnail([655, 453])
-        io_to_redis = io.BytesIO()
-        img_to_redis.save(io_to_redis, format='PNG')
-        # redis add  (atomic write)
-        pipe = DB.main.pipeline()
-        pipe.hset(DIR_CAR_INFOS, filename, js_infos)
-        pipe.hset(DIR_CAR_RAW, filename, io_to_redis.getvalue())
-        pipe.execute()
-
-    # log sync start
-    logging.info('start of sync for owncloud carousel')
-    # list local redis files
-    local_files_d = {}
-    for f_name, js_infos in DB.main.hgetall(DIR_CAR_INFOS).items():
-        try:
-            filename = f_name.decode()
-            size = json.loads(js_infos)['size']
-            local_files_d[filename] = size
-        except ValueError:
-            pass
-    # check "dir:carousel:raw:min-png" consistency
-    raw_file_l = [f.decode() for f in DB.main.hkeys(DIR_CAR_RAW)]
-    # remove orphan infos record
-    for f in list(set(local_files_d) - set(raw_file_l)):
-        logging.debug(f'remove orphan "{f}" record in hash "{DIR_CAR_INFOS}"')
-        DB.main.hdel(DIR_CAR_INFOS, f)
-        del local_files_d[f]
-    # remove orphan raw-png record
-    for f in list(set(raw_file_l) - set(local_files_d)):
-        logging.debug(f'remove orphan "{f}" record in hash "{DIR_CAR_RAW}"')
-        DB.main.hdel(DIR_CAR_RAW, f)
-    # list owncloud files (disallow directory)
-    own_files_d = {}
-    for f_d in wdv.ls(webdav_carousel_img_dir):
-        file_path = f_d['file_path']
-        size = f_d['content_length']
-        if file_path and not file_path.endswith('/'):
-            # search site only tags (_@loos_, _@messein_...) in filename
-            # site id is 16 chars max
-            site_tag_l = re.findall(r'_@([a-zA-Z0-9\-]{1,16})', file_path)
-            site_tag_l = [s.strip().lower() for s in site_tag_l]
-            site_tag_ok = 'messein' in site_tag_l or not site_tag_l
-            # download filter: ignore txt type, heavy file (>10 MB) or name tags mismatch
-            filter_ok = not file_path.lower().endswith('.txt') \
-                        and (size < 10 * 1024 * 1024) \
-                        and site_tag_ok
-            # add file to owncloud dict
-            if filter_ok:
-                own_files_d[f_d['file_path']] = size
-    # exist only on local redis
-    for f in list(set(local_files_d) - set(own_files_d)):
-        logging.info(f'"{f}" exist only on local -> remove it')
-        # redis remove (atomic)
-        pipe = DB.main.pipeline()
-        pipe.hdel(DIR_CAR_INFOS, f)
-        pipe.hdel(DIR_CAR_RAW, f)
-        pipe.execute()
-    # exist only on remote owncloud
-    for f in list(set(own_files_d) - set(local_files_d)):
-        logging.info('"%s" exist only on remote -> download it' % f)
-        data = wdv.download(os.path.join(webdav_carousel_img_dir, f))
-        if data:
-            update_carousel_raw_data(f, data)
-    # exist at both side (update only if file size change)
-    for f in list(set(local_files_d).intersection(own_files_d)):
-        local_size = local_files_d[f]
-        remote_size = own_files_d[f]
-        logging.debug(f'check "{f}" remote size [{remote_size}]/local size [{local_size}]')
-        if local_size != remote_size:
-            logging.info(f'"{f}" size mismatch -> download it')
-            data = wdv.download(os.path.join(webdav_carousel_img_dir, f))
-            if data:
-                update_carousel_raw_data(f, data)
-    # log sync end
-    logging.info('end of sync for owncloud carousel')
+    # sync owncloud carousel directory with local (only pending changes if owc_updated_job report some)
+    owc_car_sync.run()
 
 
 @catch_log_except()
 def owc_sync_doc_job():
-    # sync owncloud document directory with local
-    # local constants
-    DIR_DOC_INFOS = 'dir:doc:infos'
-    DIR_DOC_RAW = 'dir:doc:raw'
-
-    # local functions
-    def update_doc_raw_data(filename, raw_data):
-        # build json infos record
-        md5 = hashlib.md5(raw_data).hexdigest()
-        js_infos = json.dumps(dict(size=len(raw_data), md5=md5))
-        # redis add  (atomic write)
-        pipe = DB.main.pipeline()
-        pipe.hset(DIR_DOC_INFOS, filename, js_infos)
-        pipe.hset(DIR_DOC_RAW, filename, raw_data)
-        pipe.execute()
-
-    # log sync start
-    logging.info('start of sync for owncloud doc')
-    # list local redis files
-    local_files_d = {}
-    for f_name, js_infos in DB.main.hgetall(DIR_DOC_INFOS).items():
-        try:
-            filename = f_name.decode()
-            size = json.loads(js_infos)['size']
-            local_files_d[filename] = size
-        except ValueError:
-            pass
-    # check "dir:doc:raw:min-png" consistency
-    raw_file_l = [f.decode() for f in DB.main.hkeys(DIR_DOC_RAW)]
-    # remove orphan infos record
-    for f in list(set(local_files_d) - set(raw_file_l)):
-        logging.debug(f'remove orphan "{f}" record in hash "{DIR_DOC_INFOS}"')
-        DB.main.hdel(DIR_DOC_INFOS, f)
-        del local_files_d[f]
-    # remove orphan raw-png record
-    for f in list(set(raw_file_l) - set(local_files_d)):
-        logging.debug(f'remove orphan "{f}" record in hash "{DIR_DOC_RAW}"')
-        DB.main.hdel(DIR_DOC_RAW, f)
-    # list owncloud files (disallow directory)
-    own_files_d = {}
-    for f_d in wdv.ls(webdav_reglement_doc_dir):
-        file_path = f_d['file_path']
-        size = f_d['content_length']
-        if file_path and not file_path.endswith('/'):
-            # download filter: ignore txt file or heavy fie (>10 MB)
-            ok_load = not file_path.lower().endswith('.txt') \
-                      and (size < 10 * 1024 * 1024)
-            if ok_load:
-                own_files_d[f_d['file_path']] = size
-    # exist only on local redis
-    for f in list(set(local_files_d) - set(own_files_d)):
-        logging.info(f'"{f}" exist only on local -> remove it')
-        # redis remove (atomic)
-        pipe = DB.main.pipeline()
-        pipe.hdel(DIR_DOC_INFOS, f)
-        pipe.hdel(DIR_DOC_RAW, f)
-        pipe.execute()
-    # exist only on remote owncloud
-    for f in list(set(own_files_d) - set(local_files_d)):
-        logging.info(f'"{f}" exist only on remote -> download it')
-        data = wdv.download(os.path.join(webdav_reglement_doc_dir, f))
-        if data:
-            update_doc_raw_data(f, data)
-    # exist at both side (update only if file size change)
-    for f in list(set(local_files_d).intersection(own_files_d)):
-        local_size = local_files_d[f]
-        remote_size = own_files_d[f]
-        logging.debug(f'check "{f}" remote size [{remote_size}]/local size [{local_size}]')
-        if local_size != remote_size:
-            logging.info(f'"{f}" size mismatch -> download it')
-            data = wdv.download(os.path.join(webdav_reglement_doc_dir, f))
-            if data:
-                update_doc_raw_data(f, data)
-    # log sync end
-    logging.info('end of sync for owncloud doc')
+    # sync owncloud document directory with local (only pending changes if owc_updated_job report some)
+    owc_doc_sync.run()
 
 
 @catch_log_except()
@@ -386,87 +244,32 @@ def loos_redis_import_job():
         # copy redis data from loos key to local key
         data = DB.loos.get(from_remote_key)
         if data:
-            DB.main.set(to_local_key, data, ex=4 * 3600)
+            DB.main.set_if_changed(to_local_key, data, ex=4 * 3600)
 
 
 @catch_log_except()
 def vigilance_job():
-    # request XML data from server
-    r = requests.get('http://vigilance.meteofrance.com/data/NXFR34_LFPW_.xml', timeout=10.0)
+    # request XML data from server (skip it if unchanged since last run)
+    vig_url = 'http://vigilance.meteofrance.com/data/NXFR34_LFPW_.xml'
+    r = http_cli.get_if_modified(vig_url, key='json:vigilance', ex=2 * 3600, timeout=10.0)
     # check error
-    if r.status_code == 200:
-        # dom parsing (convert UTF-8 r.text to XML char)
-        dom = minidom.parseString(r.text.encode('ascii', 'xmlcharrefreplace'))
-        # set dict for dep data
-        vig_data = {'update': '', 'department': {}}
-        # map build date
-        tz = pytz.timezone('Europe/Paris')
-        map_date = str(dom.getElementsByTagName('entetevigilance')[0].getAttribute('dateinsert'))
-        map_dt = tz.localize(datetime(int(map_date[0:4]), int(map_date[4:6]),
-                                      int(map_date[6:8]), int(map_date[8:10]),
-                                      int(map_date[10:12])))
-        vig_data['update'] = map_dt.isoformat()
-        # parse every departments
-        for items in dom.getElementsByTagName('datavigilance'):
-            # current department
-            dep_code = str(items.attributes['dep'].value)
-            # get risk ID  if exist
-            risk_id = []
-            for risk in items.getElementsByTagName('risque'):
-                risk_id.append(int(risk.attributes['valeur'].value))
-            # get flood ID if exist
-            flood_id = None
-            for flood in items.getElementsByTagName('crue'):
-                flood_id = int(flood.attributes['valeur'].value)
-            # get color ID
-            color_id = int(items.attributes['couleur'].value)
-            # build vig_data
-            vig_data['department'][dep_code] = {'vig_level': color_id,
-                                                'flood_level': flood_id,
-                                                'risk_id': risk_id}
-        DB.main.set_as_json('json:vigilance', vig_data, ex=2 * 3600)
+    if r is not None and r.status_code == 200:
+        vig_data = parse_vigilance(r.content, departments=VIGILANCE_DEPARTMENTS)
+        if DB.main.set_as_json_if_changed('json:vigilance', vig_data, ex=2 * 3600) is not None:
+            http_cli.store_validators(vig_url, r)
 
 
 @catch_log_except()
 def weather_today_job():
     # request data from NOAA server (METAR of Nancy-Essey Airport)
-    r = requests.get('http://tgftp.nws.noaa.gov/data/observations/metar/stations/LFSN.TXT',
-                     timeout=10.0, headers={'User-Agent': USER_AGENT})
-    # check error
-    if r.status_code == 200:
-        # extract METAR message
-        metar_msg = r.content.decode().split('\n')[1]
-        # METAR parse
-        obs = Metar(metar_msg)
-        # init and populate d_today dict
-        d_today = {}
-        # message date and time
-        if obs.time:
-            d_today['update_iso'] = obs.time.strftime('%Y-%m-%dT%H:%M:%SZ')
-            d_today['update_fr'] = dt_utc_to_local(obs.time).strftime('%H:%M %d/%m')
-        # current temperature
-        if obs.temp:
-            d_today['temp'] = round(obs.temp.value('C'))
-        # current dew point
-        if obs.dewpt:
-            d_today['dewpt'] = round(obs.dewpt.value('C'))
-        # current pressure
-        if obs.press:
-            d_today['press'] = round(obs.press.value('hpa'))
-        # current wind speed
-        if obs.wind_speed:
-            d_today['w_speed'] = round(obs.wind_speed.value('KMH'))
-        # current wind gust
-        if obs.wind_gust:
-            d_today['w_gust'] = round(obs.wind_gust.value('KMH'))
-        # current wind direction
-        if obs.wind_dir:
-            # replace 'W'est by 'O'uest
-            d_today['w_dir'] = obs.wind_dir.compass().replace('W', 'O')
-        # weather status str
-        d_today['descr'] = 'n/a'
+    metar_url = 'http://tgftp.nws.noaa.gov/data/observations/metar/stations/LFSN.TXT'
+    r = http_cli.get_if_modified(metar_url, key='json:weather:today:nancy', ex=2 * 3600, timeout=10.0)
+    # check error (skip it if unchanged since last run)
+    if r is not None and r.status_code == 200:
+        d_today = parse_metar_today(r.content.decode())
         # store to redis
-        DB.main.set_as_json('json:weather:today:nancy', d_today, ex=2 * 3600)
+        if DB.main.set_as_json_if_changed('json:weather:today:nancy', d_today, ex=2 * 3600) is not None:
+            http_cli.store_validators(metar_url, r)
 
 
 # main
@@ -477,30 +280,49 @@ if __name__ == '__main__':
     logging.info('board-import-app started')
 
     # init webdav client
-    wdv = WebDAV(webdav_url, username=webdav_user, password=webdav_pass)
+    wdv = WebDAV(upstream_url(webdav_url), username=webdav_user, password=webdav_pass)
+
+    # init process pool for CPU heavy transforms (jobs threads only do IO and wait for it)
+    cpu_pool = CpuPool(mem_limit=768 * 1024 * 1024)
+    # owncloud directories sync (to redis hashes: infos as json manifest and raw content as blob refs)
+    cache_dir = os.getenv('BOARD_CACHE_DIR', '/data/cache')
+    owc_car_sync, owc_doc_sync = WebDAVSync.owncloud_syncs(wdv, DB.main, carousel_dir=webdav_carousel_img_dir,
+                                                           doc_dir=webdav_reglement_doc_dir, site_tag='messein',
+                                                           cpu_pool=cpu_pool, cache_dir=cache_dir,
+                                                           max_size=OWC_MAX_FILE_SIZE)
+    # only show owncloud sync plan and its timing (like BOARD_SYNC_DRY_RUN=1 python3 app.py)
+    if os.getenv('BOARD_SYNC_DRY_RUN'):
+        for owc_sync in (owc_car_sync, owc_doc_sync):
+            owc_sync.run(dry_run=True)
+        sys.exit(0)
+
+    # init job executor (jobs run on thread pools: a slow one don't delay the others)
+    # jobs metrics publish to redis hash "board:metrics:board-import-app" (and to a Prometheus textfile if set)
+    metrics = JobMetrics('board-import-app', db=DB.main, textfile=os.getenv('BOARD_METRICS_TEXTFILE'))
+    executor = JobExecutor(io_workers=8, cpu_workers=1, metrics=metrics)
 
     # init scheduler
-    schedule.every(5).minutes.do(owc_updated_job)
-    schedule.every(1).hours.do(owc_sync_carousel_job)
-    schedule.every(1).hours.do(owc_sync_doc_job)
-    schedule.every(2).minutes.do(loos_redis_import_job)
-    schedule.every(60).minutes.do(air_quality_atmo_ge_job)
-    schedule.every(5).minutes.do(dir_est_img_job)
-    schedule.every(5).minutes.do(gsheet_job)
-    schedule.every(2).minutes.do(img_gmap_traffic_job)
-    schedule.every(5).minutes.do(local_info_job)
-    schedule.every(5).minutes.do(vigilance_job)
-    schedule.every(5).minutes.do(weather_today_job)
-    # first call
-    air_quality_atmo_ge_job()
-    dir_est_img_job()
-    gsheet_job()
-    img_gmap_traffic_job()
-    local_info_job()
-    loos_redis_import_job()
-    vigilance_job()
-    weather_today_job()
-    owc_updated_job()
+    schedule.every(5).minutes.do(executor.run, owc_updated_job, deadline=300.0)
+    schedule.every(1).hours.do(executor.run, owc_sync_carousel_job)
+    schedule.every(1).hours.do(executor.run, owc_sync_doc_job)
+    schedule.every(2).minutes.do(executor.run, loos_redis_import_job, deadline=120.0)
+    schedule.every(60).minutes.do(executor.run, air_quality_atmo_ge_job, deadline=3600.0)
+    schedule.every(5).minutes.do(executor.run, dir_est_img_job, deadline=300.0)
+    schedule.every(5).minutes.do(executor.run, gsheet_job, deadline=300.0)
+    schedule.every(2).minutes.do(executor.run, img_gmap_traffic_job, deadline=120.0)
+    schedule.every(5).minutes.do(executor.run, local_info_job, deadline=300.0)
+    schedule.every(5).minutes.do(executor.run, vigilance_job, deadline=300.0)
+    schedule.every(5).minutes.do(executor.run, weather_today_job, deadline=300.0)
+    # speedup schedule for load tests (like BOARD_SCHED_SPEEDUP=100 with BOARD_UPSTREAM_URL set to a mock server)
+    if os.getenv('BOARD_SCHED_SPEEDUP'):
+        scale_schedule(float(os.getenv('BOARD_SCHED_SPEEDUP')))
+    # first call: warm-up phase, all jobs at once with an overall deadline
+    # "board:import:ready" is unset during warm-up, then set with readiness of every job
+    DB.main.delete('board:import:ready')
+    ready_d = executor.warm_up(io_jobs=[air_quality_atmo_ge_job, dir_est_img_job, gsheet_job,
+                                        img_gmap_traffic_job, local_info_job, loos_redis_import_job,
+                                        vigilance_job, weather_today_job, owc_updated_job], timeout=30.0)
+    DB.main.set_as_json('board:import:ready', dict(update=datetime.now().isoformat('T'), jobs=ready_d))
 
     # main loop
     while True:
@@ -0,0 +1 @@
+../../common/python-lib/board_parsers.py
\ No newline at end of file
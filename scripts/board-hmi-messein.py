@@ -3,10 +3,11 @@
 import argparse
 from configparser import ConfigParser
 import logging
+import os
 import tkinter as tk
 from tkinter import ttk
 from board_hmi_lib import \
-    CustomRedis, Tag, TagsBase, Tab, PdfTab, Geometry, wait_uptime, \
+    CustomRedis, PowerSave, Tag, TagsBase, Tab, PdfTab, Geometry, wait_uptime, \
     AirQualityTile, ClockTile, DaysAccTileMessein, FlysprayTile, GaugeTile, \
     ImageRawTile, ImageRawCarouselTile, NewsBannerTile, TwitterTile, VigilanceTile
 
@@ -38,15 +39,15 @@ class Tags(TagsBase):
     L_FLYSPRAY_RSS = Tag(read=lambda: DB.main.get_js('from:loos:json:flyspray-est'), io_every=2.0)
     IMG_ATMO_GE = Tag(read=lambda: DB.main.get('img:static:logo-atmo-ge:png'), io_every=10.0)
     IMG_LOGO_GRT = Tag(read=lambda: DB.main.get('img:static:logo-grt:png'), io_every=10.0)
-    IMG_GRT_CLOUD = Tag(read=lambda: DB.main.get('from:loos:img:grt-twitter-cloud:png'), io_every=10.0)
-    IMG_TRAFFIC_MAP = Tag(read=lambda: DB.main.get('img:traffic-map:png'), io_every=10.0)
-    IMG_DIR_CAM_HOUDEMONT = Tag(read=lambda: DB.main.get('img:dir-est:houdemont:png'), io_every=10.0)
-    IMG_DIR_CAM_VELAINE = Tag(read=lambda: DB.main.get('img:dir-est:velaine:png'), io_every=10.0)
-    IMG_DIR_CAM_ST_NICOLAS = Tag(read=lambda: DB.main.get('img:dir-est:st-nicolas:png'), io_every=10.0)
-    IMG_DIR_CAM_FLAVIGNY = Tag(read=lambda: DB.main.get('img:dir-est:flavigny:png'), io_every=10.0)
-    DIR_CAROUSEL_RAW = Tag(read=lambda: DB.main.hgetall('dir:carousel:raw:min-png'), io_every=10.0)
-    DIR_PDF_DOC_LIST = Tag(read=lambda: map(bytes.decode, DB.main.hkeys('dir:doc:raw')))
-    RAW_PDF_DOC_CONTENT = Tag(read=lambda file: DB.main.hget('dir:doc:raw', file))
+    IMG_GRT_CLOUD = Tag(read=lambda: DB.main.get_on_change('from:loos:img:grt-twitter-cloud:png'), io_every=10.0)
+    IMG_TRAFFIC_MAP = Tag(read=lambda: DB.main.get_on_change('img:traffic-map:png'), io_every=10.0)
+    IMG_DIR_CAM_HOUDEMONT = Tag(read=lambda: DB.main.get_on_change('img:dir-est:houdemont:png'), io_every=10.0)
+    IMG_DIR_CAM_VELAINE = Tag(read=lambda: DB.main.get_on_change('img:dir-est:velaine:png'), io_every=10.0)
+    IMG_DIR_CAM_ST_NICOLAS = Tag(read=lambda: DB.main.get_on_change('img:dir-est:st-nicolas:png'), io_every=10.0)
+    IMG_DIR_CAM_FLAVIGNY = Tag(read=lambda: DB.main.get_on_change('img:dir-est:flavigny:png'), io_every=10.0)
+    DIR_CAROUSEL_RAW = Tag(read=lambda: DB.main.hgetall_blobs('dir:carousel:ref:min-png'), io_every=10.0)
+    DIR_PDF_DOC_LIST = Tag(read=lambda: map(bytes.decode, DB.main.hkeys('dir:doc:ref')))
+    RAW_PDF_DOC_CONTENT = Tag(read=lambda file: DB.main.hget_blob('dir:doc:ref', file))
 
 
 class MainApp(tk.Tk):
@@ -57,6 +58,7 @@ class MainApp(tk.Tk):
         self.user_idle_timeout_s = 900
         # private
         self._idle_timer = None
+        self._power_save = False
         # tk stuff
         # remove mouse icon in touchscreen mode (default)
         if not app_conf.cursor:
@@ -83,6 +85,8 @@ class MainApp(tk.Tk):
         # bind function for manage user idle time
         self.bind_all('<Any-KeyPress>', self._trig_user_idle_t)
         self.bind_all('<Any-ButtonPress>', self._trig_user_idle_t)
+        # follow screen power state
+        self._power_save_check()
 
     def _trig_user_idle_t(self, _evt):
         # cancel the previous event
@@ -95,6 +99,18 @@ class MainApp(tk.Tk):
         # select first tab
         self.note.select(self.tab1)
 
+    def _power_save_check(self):
+        # on screen wake up: refresh all tabs at once (after IO thread catch up)
+        if self._power_save != PowerSave.is_on():
+            self._power_save = PowerSave.is_on()
+            if not self._power_save:
+                self.after(ms=1000, func=self._on_wake_up)
+        self.after(ms=1000, func=self._power_save_check)
+
+    def _on_wake_up(self):
+        for tab in (self.tab1, self.tab2):
+            tab.update()
+
 
 class LiveTab(Tab):
     """ Main dynamic Tab """
@@ -252,10 +268,19 @@ class LiveTab(Tab):
 if __name__ == '__main__':
     # parse command line args
     parser = argparse.ArgumentParser()
+    parser.add_argument('-b', '--broker', action='store_true', default=False,
+                        help='run as tags broker for local HMI clients (no GUI)')
+    parser.add_argument('-B', '--broker-client', action='store_true', default=False,
+                        help='read tags from the local tags broker')
+    parser.add_argument('--broker-sock', action='store', type=str,
+                        default=os.path.expanduser('~/.board-tags-broker.sock'),
+                        help='tags broker unix socket path (default is ~/.board-tags-broker.sock)')
     parser.add_argument('-c', '--cursor', action='store_true', default=False,
                         help='display mouse cursor')
     parser.add_argument('-d', '--debug', action='store_true', default=False,
                         help='debug mode')
+    parser.add_argument('-n', '--no-power-save', action='store_true', default=False,
+                        help='stay in normal mode when screen is off')
     parser.add_argument('-s', '--skip-full', action='store_true', default=False,
                         help='skip fullscreen mode')
     parser.add_argument('-w', '--wait-up', action='store', type=float, default=30.0,
@@ -268,9 +293,16 @@ if __name__ == '__main__':
     # logging setup
     lvl = logging.DEBUG if app_conf.debug else logging.INFO
     logging.basicConfig(format='%(asctime)s %(message)s', level=lvl)
+    # tags broker mode: share Tags values with local HMI clients
+    if app_conf.broker:
+        logging.info('board-hmi-app started as tags broker')
+        Tags.serve_broker(app_conf.broker_sock)
     logging.info('board-hmi-app started')
     # init Tags
-    Tags.init()
+    Tags.init(broker_sock=app_conf.broker_sock if app_conf.broker_client else None)
+    # init screen power state watcher (skip it with --no-power-save)
+    if not app_conf.no_power_save:
+        PowerSave.init()
     # start tkinter
     app = MainApp()
     app.title('GRTgaz Dashboard')
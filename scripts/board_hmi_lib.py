@@ -8,6 +8,9 @@ import io
 import json
 import math
 import os
+import pickle
+import socket
+import struct
 import subprocess
 import tempfile
 import locale
@@ -100,6 +103,17 @@ def wait_uptime(min_s: float):
 # some class
 class CustomRedis(redis.Redis):
     LOG_LEVEL = logging.DEBUG
+    BLOB_PREFIX = 'blob:'
+    BLOB_READ_BATCH = 8
+    VERSION_KEY = 'meta:version'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # private
+        self._on_change_cache_d = {}
+        self._blob_lock = threading.Lock()
+        self._blob_cache_d = {}
+        self._blob_refs_d = {}
 
     @catch_log_except(catch=redis.RedisError, log_lvl=LOG_LEVEL)
     def execute_command(self, *args, **options):
@@ -113,6 +127,171 @@ class CustomRedis(redis.Redis):
     def get_js(self, name):
         return json.loads(super().get(name).decode('utf-8'))
 
+    @catch_log_except(catch=redis.RedisError, log_lvl=LOG_LEVEL)
+    def get_on_change(self, name):
+        # get a key write by import app with set_if_changed(): only fetch value if its version change
+        # return a local cached value otherwise (or None if key is gone)
+        # WARN: no MULTI/EXEC here, slaves ACL don't allow @transaction for HMI user
+        pipe = self.pipeline(transaction=False)
+        pipe.hget(self.VERSION_KEY, name)
+        pipe.exists(name)
+        version, exists = pipe.execute()
+        if not exists:
+            self._on_change_cache_d.pop(name, None)
+            return None
+        cache_version, cache_value = self._on_change_cache_d.get(name, (None, None))
+        if version is None or version != cache_version:
+            cache_value = self.get(name)
+            self._on_change_cache_d[name] = (version, cache_value)
+        return cache_value
+
+    @catch_log_except(catch=(redis.RedisError, AttributeError), log_lvl=LOG_LEVEL)
+    def hgetall_blobs(self, name):
+        # get a hash of blob refs write by import app (BlobStore) as a dict {field: blob}
+        # only blobs with a digest unknown to the local cache are fetch
+        refs_d = {field: digest.decode() for field, digest in self.hgetall(name).items()}
+        return self._get_blobs(name, refs_d)
+
+    @catch_log_except(catch=(redis.RedisError, AttributeError), log_lvl=LOG_LEVEL)
+    def hget_blob(self, name, field):
+        # get the blob of field in a hash of blob refs (None if field is gone)
+        digest = self.hget(name, field)
+        if digest is None:
+            return None
+        return self._get_blobs(name, {field: digest.decode()})[field]
+
+    @catch_log_except(catch=(redis.RedisError, AttributeError, KeyError, ValueError), log_lvl=LOG_LEVEL)
+    def read_blob(self, digest, offset=0, length=None):
+        # read length bytes (all if None) of a blob from offset, return None if blob is unknown (or incomplete)
+        # a chunked blob (index hash + chunks, see import app BlobStore) is read by batches of chunks in pipelines
+        key = f'{self.BLOB_PREFIX}{digest}'
+        index_d = self.hgetall(f'{key}:index')
+        if not index_d:
+            if not offset and length is None:
+                return self.get(key)
+            # a range at or past end of value is b'' (like a chunked blob), an unknown blob is None
+            pipe = self.pipeline(transaction=False)
+            pipe.exists(key)
+            if length != 0:
+                pipe.getrange(key, offset, -1 if length is None else offset + length - 1)
+            exists, *data_l = pipe.execute()
+            return (data_l[0] if data_l else b'') if exists else None
+        size, chunk_size = int(index_d[b'size']), int(index_d[b'chunk_size'])
+        stop = size if length is None else min(size, offset + length)
+        if offset >= stop:
+            return b''
+        first, last = offset // chunk_size, (stop - 1) // chunk_size
+        chunks_l = []
+        for batch_first in range(first, last + 1, self.BLOB_READ_BATCH):
+            pipe = self.pipeline(transaction=False)
+            for n in range(batch_first, min(batch_first + self.BLOB_READ_BATCH, last + 1)):
+                pipe.get(f'{key}:{n}')
+            chunks_l.extend(pipe.execute())
+        if None in chunks_l:
+            return None
+        data = b''.join(chunks_l)
+        return data[offset - first * chunk_size:stop - first * chunk_size]
+
+    def _get_blobs(self, name, refs_d):
+        # WARNs: -> local cache only keep blobs of the last call by name (and a blob is never fetch twice)
+        #        -> call from IO thread and tk main thread
+        with self._blob_lock:
+            missing_l = sorted(set(refs_d.values()) - set(self._blob_cache_d))
+        blobs_l = self.mget([self.BLOB_PREFIX + digest for digest in missing_l]) if missing_l else []
+        # a missing value may be a chunked blob
+        blobs_l = [blob if blob is not None else self.read_blob(digest)
+                   for digest, blob in zip(missing_l, blobs_l or [None] * len(missing_l))]
+        with self._blob_lock:
+            for digest, blob in zip(missing_l, blobs_l):
+                if blob is not None:
+                    self._blob_cache_d[digest] = blob
+            # forget blobs that are no longer referenced
+            self._blob_refs_d[name] = set(refs_d.values())
+            used_set = set().union(*self._blob_refs_d.values())
+            for digest in set(self._blob_cache_d) - used_set:
+                del self._blob_cache_d[digest]
+            return {field: self._blob_cache_d.get(digest) for field, digest in refs_d.items()}
+
+
+class PowerSave:
+    # screen state watcher: set low-power mode when screen is blank (xscreensaver) or off (DPMS)
+    # WARNs: -> state is update by watch threads, use is_on() from tk main thread or IO thread
+    #        -> when screen is off, tk cyclic updates are skip and Tags IO thread poll at LOW_POWER_IO_EVERY
+    DPMS_POLL_EVERY = 30.0
+    LOW_POWER_IO_EVERY = 60.0
+    _xss_blank = threading.Event()
+    _dpms_off = threading.Event()
+    _wake_up = threading.Event()
+
+    @classmethod
+    def init(cls):
+        # start watch threads
+        threading.Thread(target=cls._xss_watch_task, daemon=True).start()
+        threading.Thread(target=cls._dpms_poll_task, daemon=True).start()
+
+    @classmethod
+    def is_on(cls):
+        return cls._xss_blank.is_set() or cls._dpms_off.is_set()
+
+    @classmethod
+    def wait_wake_up(cls, timeout=None):
+        # block caller until screen wake up (or timeout expire), return True if screen is on
+        cls._wake_up.wait(timeout=timeout)
+        return not cls.is_on()
+
+    @classmethod
+    def _update(cls, evt, screen_off):
+        # apply state change to an event flag, log and notify waiting threads on screen wake up
+        was_on = cls.is_on()
+        if screen_off:
+            evt.set()
+        else:
+            evt.clear()
+        if cls.is_on() != was_on:
+            if cls.is_on():
+                logging.info('screen is off: switch to low-power mode')
+                cls._wake_up.clear()
+            else:
+                logging.info('screen is on: leave low-power mode')
+                cls._wake_up.set()
+
+    @classmethod
+    def _xss_watch_task(cls):
+        # follow xscreensaver events (BLANK, LOCK, RUN, UNBLANK...)
+        while True:
+            try:
+                ps = subprocess.Popen(['xscreensaver-command', '-watch'], stdin=subprocess.DEVNULL,
+                                      stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      universal_newlines=True)
+            except OSError as e:
+                logging.warning(f'xscreensaver watch unavailable: {e}')
+                return
+            for line in ps.stdout:
+                evt_args = line.split()
+                if evt_args and evt_args[0] in ('BLANK', 'LOCK', 'RUN'):
+                    cls._update(cls._xss_blank, screen_off=True)
+                elif evt_args and evt_args[0] == 'UNBLANK':
+                    cls._update(cls._xss_blank, screen_off=False)
+            # xscreensaver daemon exit: assume screen is on and retry later
+            ps.wait()
+            cls._update(cls._xss_blank, screen_off=False)
+            time.sleep(10.0)
+
+    @classmethod
+    def _dpms_poll_task(cls):
+        # periodically check DPMS monitor state with "xset q"
+        while True:
+            try:
+                xset_out = subprocess.run(['xset', 'q'], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                          stderr=subprocess.DEVNULL, universal_newlines=True, timeout=5.0).stdout
+            except (OSError, subprocess.SubprocessError) as e:
+                logging.warning(f'DPMS poll unavailable: {e}')
+                return
+            # "Monitor is On", "Monitor is Off", "Monitor is in Standby", "Monitor is in Suspend"
+            monitor_off = 'Monitor is' in xset_out and 'Monitor is On' not in xset_out
+            cls._update(cls._dpms_off, screen_off=monitor_off)
+            time.sleep(cls.DPMS_POLL_EVERY)
+
 
 class Tag:
     def __init__(self, value=None, read=None, write=None, io_every=None):
@@ -124,11 +303,11 @@ class Tag:
         self._th_io_every = io_every
         self._th_last_run = 0.0
 
-    def io_update(self, ref=''):
+    def io_update(self, ref='', force=False):
         # method call by Tags io thread
         if self._th_io_every:
             t_now = time.monotonic()
-            run_now = (t_now - self._th_last_run) > self._th_io_every
+            run_now = force or (t_now - self._th_last_run) > self._th_io_every
             # if read method is define, do it
             if run_now:
                 self._th_last_run = t_now
@@ -156,6 +335,15 @@ class Tag:
                     except Exception:
                         pass
 
+    def io_feed(self, value):
+        # update tag value from an external source (tags broker)
+        with self._lock:
+            self._value = value
+
+    @property
+    def is_io_tag(self):
+        return bool(self._th_io_every)
+
     def set(self, value):
         with self._lock:
             self._value = value
@@ -203,29 +391,150 @@ class Tag:
                 return copy.copy(self._value)
 
 
+class TagsBroker:
+    # local tags broker: publish IO tags values to HMI clients over an unix socket
+    # WARNs: -> one frame is send after every IO thread loop with only values that have changed since the last one
+    #        -> a new client receive a full snapshot at connect time
+    #        -> frame format: [size as 4 bytes big-endian int][pickle of dict {tag name: value}]
+    #        -> socket file is only accessible to current user (pickle data must come from a trusted source)
+
+    def __init__(self, sock_path):
+        # private
+        self._clients_l = list()
+        self._last_d = dict()
+        self._lock = threading.Lock()
+        # bind server socket (remove stale socket file of a previous run)
+        try:
+            os.unlink(sock_path)
+        except FileNotFoundError:
+            pass
+        self._srv_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._srv_sock.bind(sock_path)
+        os.chmod(sock_path, 0o600)
+        self._srv_sock.listen()
+        # start accept thread
+        threading.Thread(target=self._accept_task, daemon=True).start()
+
+    @staticmethod
+    def frame(values_d):
+        data = pickle.dumps(values_d, protocol=pickle.HIGHEST_PROTOCOL)
+        return struct.pack('>I', len(data)) + data
+
+    @staticmethod
+    def read_frame(sock_f):
+        header = sock_f.read(4)
+        if len(header) < 4:
+            raise ConnectionError('broker connection closed')
+        size, = struct.unpack('>I', header)
+        data = sock_f.read(size)
+        if len(data) < size:
+            raise ConnectionError('broker connection closed')
+        return pickle.loads(data)
+
+    def publish(self, values_d):
+        # change detection: only send updated values
+        with self._lock:
+            update_d = {name: value for name, value in values_d.items()
+                        if name not in self._last_d or self._last_d[name] != value}
+            if not update_d:
+                return
+            self._last_d.update(update_d)
+            frame = self.frame(update_d)
+            # send to every client, drop disconnected ones
+            for conn in list(self._clients_l):
+                try:
+                    conn.sendall(frame)
+                except OSError:
+                    logging.debug('tags broker: drop a client')
+                    conn.close()
+                    self._clients_l.remove(conn)
+
+    def _accept_task(self):
+        while True:
+            conn, _ = self._srv_sock.accept()
+            conn.settimeout(5.0)
+            logging.debug('tags broker: new client')
+            with self._lock:
+                try:
+                    conn.sendall(self.frame(self._last_d))
+                    self._clients_l.append(conn)
+                except OSError:
+                    conn.close()
+
+
 class TagsBase:
     # create all tags here
     # WARNs: -> all tags with io_every set are manage by an independent (of tk mainloop) IO thread
     #           this thread periodically update tag value and avoid tk GUI loop do this and lose time on DB IO
     #        -> tags callbacks (read/write methods) are call by this IO thread (not by tkinter main thread)
+    #        -> in broker client mode, values of IO tags are receive from the tags broker (no local DB IO)
     __IO_THREAD_TAG_LIST = list()
 
     @classmethod
-    def init(cls):
+    def init(cls, broker_sock=None):
         # compile tag list for IO thread before starting it
         for name, attr in cls.__dict__.items():
             if not name.startswith('__') and isinstance(attr, Tag):
                 cls.__IO_THREAD_TAG_LIST.append((name, attr))
-        # start IO thread
-        threading.Thread(target=cls._io_thread_task, daemon=True).start()
+        # start IO thread or broker client thread
+        if broker_sock:
+            threading.Thread(target=cls._broker_client_task, args=(broker_sock,), daemon=True).start()
+        else:
+            threading.Thread(target=cls._io_thread_task, daemon=True).start()
+
+    @classmethod
+    def serve_broker(cls, broker_sock):
+        # run as tags broker: IO thread job is done here, publish values to clients after every loop (never return)
+        for name, attr in cls.__dict__.items():
+            if not name.startswith('__') and isinstance(attr, Tag):
+                cls.__IO_THREAD_TAG_LIST.append((name, attr))
+        broker = TagsBroker(broker_sock)
+        logging.info(f'tags broker listen on "{broker_sock}"')
+        cls._io_thread_task(on_loop=lambda: broker.publish({name: tag.get()
+                                                            for name, tag in cls.__IO_THREAD_TAG_LIST
+                                                            if tag.is_io_tag}))
 
     @classmethod
-    def _io_thread_task(cls):
+    def _io_thread_task(cls, on_loop=None):
         # IO thread main loop
+        force_update = False
         while True:
             for name, tag in cls.__IO_THREAD_TAG_LIST:
-                tag.io_update(ref=name)
-            time.sleep(1.0)
+                tag.io_update(ref=name, force=force_update)
+            force_update = False
+            # notify end of loop (tags broker publish)
+            if on_loop:
+                on_loop()
+            # in low-power mode: poll at a trickle rate until screen wake up
+            if PowerSave.is_on():
+                # on wake up: catch up with one refresh of all tags
+                force_update = PowerSave.wait_wake_up(timeout=PowerSave.LOW_POWER_IO_EVERY)
+            else:
+                time.sleep(1.0)
+
+    @classmethod
+    def _broker_client_task(cls, broker_sock):
+        # broker client main loop: feed IO tags with values receive from the tags broker
+        tags_d = {name: tag for name, tag in cls.__IO_THREAD_TAG_LIST if tag.is_io_tag}
+        broker_ok = True
+        while True:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(broker_sock)
+                    logging.info(f'connected to tags broker "{broker_sock}"')
+                    broker_ok = True
+                    sock_f = sock.makefile('rb')
+                    while True:
+                        for name, value in TagsBroker.read_frame(sock_f).items():
+                            if name in tags_d:
+                                tags_d[name].io_feed(value)
+            except (OSError, EOFError, pickle.UnpicklingError) as e:
+                # only log state change (avoid a log line at every retry)
+                if broker_ok:
+                    logging.warning(f'tags broker "{broker_sock}" unavailable: {e}')
+                broker_ok = False
+            # retry later
+            time.sleep(2.0)
 
 
 # Tab library
@@ -263,7 +572,8 @@ class Tab(tk.Frame):
         self._do_cyclic_update()
 
     def _do_cyclic_update(self):
-        if self.winfo_ismapped():
+        # skip update when tab is hide or screen is off
+        if self.winfo_ismapped() and not PowerSave.is_on():
             self.update()
         self.after(self._update_ms, self._do_cyclic_update)
 
@@ -378,7 +688,8 @@ class Tile(tk.Frame):
         self._do_cyclic_update()
 
     def _do_cyclic_update(self):
-        if self.winfo_ismapped():
+        # skip update when tile is hide or screen is off
+        if self.winfo_ismapped() and not PowerSave.is_on():
             self.update()
         self.after(self._update_ms, self._do_cyclic_update)
 
@@ -771,6 +1082,9 @@ class ImageTile(Tile):
 class ImageRawTile(Tile):
     def __init__(self, *args, **kwargs):
         Tile.__init__(self, *args, **kwargs)
+        # private
+        self._raw_display = None
+        self._raw_size = None
         # tk widget init
         self.tk_img = tk.PhotoImage()
         self.lbl_img = tk.Label(self, bg=self.cget('bg'))
@@ -778,12 +1092,17 @@ class ImageRawTile(Tile):
 
     @property
     def raw_display(self):
-        return self.raw_display
+        return self._raw_display
 
     @raw_display.setter
     def raw_display(self, value):
         try:
             widget_size = (self.winfo_width(), self.winfo_height())
+            # skip image decoding if raw data and widget size are unchanged
+            if value and value == self._raw_display and widget_size == self._raw_size:
+                return
+            self._raw_display = value
+            self._raw_size = widget_size
             # display current image file if raw_img is set
             if value:
                 # RAW img data to Pillow (PIL) image
@@ -893,6 +1212,8 @@ class ImageRawCarouselTile(Tile):
         # private
         self._playlist = list()
         self._skip_update_cnt = 0
+        self._raw_display = None
+        self._raw_size = None
         # tk widget init
         # don't remove tk_img: keep a ref to avoid del by garbage collect
         self.tk_img = tk.PhotoImage()
@@ -908,12 +1229,17 @@ class ImageRawCarouselTile(Tile):
 
     @property
     def raw_display(self):
-        return self.raw_display
+        return self._raw_display
 
     @raw_display.setter
     def raw_display(self, value):
         try:
             widget_size = (self.winfo_width(), self.winfo_height())
+            # skip image decoding if raw data and widget size are unchanged
+            if value and value == self._raw_display and widget_size == self._raw_size:
+                return
+            self._raw_display = value
+            self._raw_size = widget_size
             # display current image file if raw_img is set
             if value:
                 # RAW img data to Pillow (PIL) image
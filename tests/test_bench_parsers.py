@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+# performance of import jobs parsers vs the committed baseline (utils/bench-fixtures/baseline.json)
+# run with: python -m pytest -q tests
+# WARN: times depend on the host, they are check with a loose tolerance (BOARD_BENCH_TIME_TOLERANCE env var, default
+#       is 2.0 so +200%), peak memory use the bench one (25%): refresh baseline with utils/bench_parsers.py
+#       --save-baseline after an intended change
+
+import os
+import sys
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'utils'))
+bench_parsers = pytest.importorskip('bench_parsers')
+
+# some const
+ROUNDS = 5
+TOLERANCE = 0.25
+TIME_TOLERANCE = float(os.getenv('BOARD_BENCH_TIME_TOLERANCE', '2.0'))
+BASELINE_D = bench_parsers.load_baseline()
+CASES_L = [pytest.param(name, func, id=name) for name, func in bench_parsers.bench_cases()]
+
+
+# some function
+def test_baseline_exists():
+    assert BASELINE_D, f'no baseline in {bench_parsers.BASELINE_FILE}'
+
+
+@pytest.mark.parametrize('name, func', CASES_L)
+def test_no_regression(name, func):
+    if name not in BASELINE_D:
+        pytest.skip(f'no baseline for {name}')
+    res_d = bench_parsers.run_case(func, rounds=ROUNDS)
+    t_ratio, m_ratio, is_regress = bench_parsers.compare(res_d, BASELINE_D[name], tolerance=TOLERANCE,
+                                                         time_tolerance=TIME_TOLERANCE)
+    assert not is_regress, f'{name} regression vs baseline: time {t_ratio:+.0%} mem {m_ratio:+.0%}'
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# range reads of blobs (import app BlobStore and HMI CustomRedis) on both layouts: whole value and chunks
+# run with: python -m pytest -q tests
+
+import os
+import sys
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'docker', 'common', 'python-lib'))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+from board_lib import BlobStore
+
+# some const
+DATA = bytes(range(256)) * 4
+
+
+# some class
+class FakePipeline:
+    def __init__(self, db):
+        self.db = db
+        self.cmds_l = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.cmds_l.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.db, name)(*args, **kwargs) for name, args, kwargs in self.cmds_l]
+
+
+class FakeRedis:
+    # in memory subset of redis commands used by blob stores
+    def __init__(self):
+        self.d = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def exists(self, *names):
+        return sum(name in self.d for name in names)
+
+    def get(self, name):
+        return self.d.get(name)
+
+    def set(self, name, value):
+        self.d[name] = bytes(value)
+
+    def getrange(self, name, start, end):
+        value = self.d.get(name, b'')
+        return value[start:] if end == -1 else value[start:end + 1]
+
+    def hgetall(self, name):
+        return dict(self.d.get(name, {}))
+
+    def hset(self, name, mapping):
+        self.d.setdefault(name, {}).update({k.encode(): str(v).encode() for k, v in mapping.items()})
+
+
+def hmi_reader(db):
+    # HMI CustomRedis.read_blob() bind to a fake redis
+    board_hmi_lib = pytest.importorskip('board_hmi_lib')
+
+    class FakeHmiRedis(FakeRedis):
+        BLOB_PREFIX = board_hmi_lib.CustomRedis.BLOB_PREFIX
+        BLOB_READ_BATCH = 2
+        read_blob = board_hmi_lib.CustomRedis.read_blob
+
+    hmi_db = FakeHmiRedis()
+    hmi_db.d = db.d
+    return hmi_db.read_blob
+
+
+# some function
+@pytest.fixture(params=[None, 100], ids=['whole', 'chunked'])
+def store(request):
+    return BlobStore(FakeRedis(), chunk_size=request.param)
+
+
+@pytest.mark.parametrize('offset, length', [(0, None), (0, 10), (95, 10), (99, 2), (250, None), (1000, 24),
+                                            (1023, 5), (0, 0), (500, 0)])
+def test_read_range(store, offset, length):
+    digest = store.put(DATA)
+    expected = DATA[offset:] if length is None else DATA[offset:offset + length]
+    assert store.read(digest, offset, length) == expected
+    assert hmi_reader(store.db)(digest, offset, length) == expected
+
+
+@pytest.mark.parametrize('offset, length', [(1024, None), (1024, 10), (2000, None), (2000, 10)])
+def test_read_at_eof(store, offset, length):
+    digest = store.put(DATA)
+    assert store.read(digest, offset, length) == b''
+    assert hmi_reader(store.db)(digest, offset, length) == b''
+
+
+def test_read_unknown(store):
+    digest = BlobStore.digest(b'unknown')
+    assert store.read(digest) is None
+    assert store.read(digest, 10, 10) is None
+    assert hmi_reader(store.db)(digest, 10, 10) is None
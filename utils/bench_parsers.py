@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of import jobs parsers (docker/common/python-lib/board_parsers.py) with recorded payloads.
+
+Run offline, report median time and peak memory of every parser, then compare them to the stored baseline:
+exit status is 1 if a parser is slower or use more memory than baseline + tolerance.
+The same check run in test suite (tests/test_bench_parsers.py) against the committed baseline.
+
+    ./bench_parsers.py                    # run bench, compare to bench-fixtures/baseline.json (if exist)
+    ./bench_parsers.py --save-baseline    # run bench and store results as the new baseline
+    ./bench_parsers.py --record           # refresh fixtures of keyless sources (need network)
+
+WARN: a baseline is only meaningful on the host that produced it (run --save-baseline on the target host)
+"""
+
+import argparse
+from datetime import date, datetime
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+# board_parsers and board_lib are in docker python-lib directory
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'docker', 'common', 'python-lib'))
+from board_parsers import parse_atmo_zones, parse_metar_today, parse_owm_forecast, parse_rss_titles, \
+    parse_vigilance, tw_hashtags_freq, word_cloud_png
+
+# some const
+FIXTURES_DIR = os.path.join(HERE, 'bench-fixtures')
+BASELINE_FILE = os.path.join(FIXTURES_DIR, 'baseline.json')
+# fixtures were recorded on this day (parsers that retain "today" values use it)
+FIXTURES_DATE = date(2022, 10, 19)
+# a regression below these slacks is ignore (sub-millisecond or few kB parsers are in measure noise)
+TIME_SLACK_MS = 0.5
+MEM_SLACK_KB = 4.0
+# vigilance departments of Loos HMI
+VIG_DEPARTMENTS = ('59', '62', '80', '02', '60')
+# keyless sources that can be re-recorded with --record
+RECORD_URLS = {
+    'atmo-hdf.json': 'https://services8.arcgis.com/rxZzohbySMKHTNcy/arcgis/rest/services/ind_hdf_3j/FeatureServer/0/'
+                     'query?where=code_zone%20IN%20(02691%2C%2059183%2C%2059350%2C%2059392%2C%2059606%2C%2080021)'
+                     '&outFields=date_ech,%20code_qual,%20lib_qual,%20lib_zone,%20code_zone'
+                     '&returnGeometry=false&resultRecordCount=48&orderByFields=date_ech%20DESC&f=json',
+    'metar-LFQQ.TXT': 'http://tgftp.nws.noaa.gov/data/observations/metar/stations/LFQQ.TXT',
+    'rss-france3.xml': 'https://france3-regions.francetvinfo.fr/societe/rss?r=hauts-de-france',
+    'vigilance.xml': 'http://vigilance.meteofrance.com/data/NXFR34_LFPW_.xml',
+}
+
+
+# some function
+def load(filename):
+    with open(os.path.join(FIXTURES_DIR, filename), 'rb') as f:
+        return f.read()
+
+
+def bench_cases():
+    # list of (case name, callable) with fixtures load out of the measured call
+    atmo_d = json.loads(load('atmo-hdf.json'))
+    metar_txt = load('metar-LFQQ.TXT').decode()
+    owm_d = json.loads(load('owm-forecast.json'))
+    rss_raw = load('rss-france3.xml')
+    vig_raw = load('vigilance.xml')
+    tw_d = json.loads(load('tw-search.json'))
+    fixtures_dt = datetime.combine(FIXTURES_DATE, datetime.min.time())
+    cases_l = [('parse_atmo_zones', lambda: parse_atmo_zones(atmo_d, today_dt_date=FIXTURES_DATE)),
+               ('parse_metar_today', lambda: parse_metar_today(metar_txt)),
+               ('parse_owm_forecast', lambda: parse_owm_forecast(owm_d, now_dt=fixtures_dt)),
+               ('parse_rss_titles', lambda: parse_rss_titles(rss_raw)),
+               ('parse_vigilance', lambda: parse_vigilance(vig_raw)),
+               ('parse_vigilance_filtered', lambda: parse_vigilance(vig_raw, departments=VIG_DEPARTMENTS)),
+               ('tw_hashtags_freq', lambda: tw_hashtags_freq(tw_d))]
+    if importlib.util.find_spec('wordcloud'):
+        d_freq = tw_hashtags_freq(tw_d)
+        cases_l.append(('word_cloud_png', lambda: word_cloud_png(d_freq)))
+    else:
+        print('wordcloud package is not available: skip word_cloud_png')
+    return cases_l
+
+
+def load_baseline():
+    # baseline dict {case name: result dict}, empty if there is no baseline file
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(res_d, base_d, tolerance, time_tolerance=None):
+    # return (time ratio, memory ratio, is regression) of a result vs its baseline
+    # time_tolerance default to tolerance (a slower test host can use a looser one)
+    time_tolerance = tolerance if time_tolerance is None else time_tolerance
+    t_ratio = res_d['median_ms'] / base_d['median_ms'] - 1
+    m_ratio = res_d['peak_kb'] / base_d['peak_kb'] - 1
+    t_regress = t_ratio > time_tolerance and res_d['median_ms'] - base_d['median_ms'] > TIME_SLACK_MS
+    m_regress = m_ratio > tolerance and res_d['peak_kb'] - base_d['peak_kb'] > MEM_SLACK_KB
+    return t_ratio, m_ratio, t_regress or m_regress
+
+
+def run_case(func, rounds):
+    # warm up (imports, caches), then timed rounds and a memory traced round
+    func()
+    times_l = []
+    for _ in range(rounds):
+        t_start = time.perf_counter()
+        func()
+        times_l.append(time.perf_counter() - t_start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dict(median_ms=round(statistics.median(times_l) * 1000, 3), min_ms=round(min(times_l) * 1000, 3),
+                peak_kb=round(peak / 1024, 1))
+
+
+def record():
+    import requests
+
+    for filename, url in RECORD_URLS.items():
+        try:
+            r = requests.get(url, timeout=10.0)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            print(f'unable to record {filename}: {e}')
+            continue
+        with open(os.path.join(FIXTURES_DIR, filename), 'wb') as f:
+            f.write(r.content)
+        print(f'{filename} recorded ({len(r.content)} bytes)')
+    print(f'WARN: update FIXTURES_DATE in {os.path.basename(__file__)} and run --save-baseline')
+
+
+# main
+if __name__ == '__main__':
+    # parse command line
+    parser = argparse.ArgumentParser(description='benchmark of import jobs parsers with recorded payloads')
+    parser.add_argument('-n', '--rounds', type=int, default=20, help='timed rounds by parser (default is 20)')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.25,
+                        help='allowed regression ratio vs baseline (default is 0.25)')
+    parser.add_argument('--save-baseline', action='store_true', help='store results as the new baseline')
+    parser.add_argument('--record', action='store_true', help='refresh fixtures of keyless sources')
+    args = parser.parse_args()
+
+    if args.record:
+        record()
+        sys.exit(0)
+
+    # load baseline
+    baseline_d = load_baseline()
+    if not baseline_d and not args.save_baseline:
+        print('no baseline file: run with --save-baseline to create it')
+
+    # run bench
+    results_d = {}
+    regressions_l = []
+    print(f'{"parser":<26} {"median (ms)":>12} {"min (ms)":>10} {"peak (kB)":>10}  vs baseline')
+    for name, func in bench_cases():
+        res_d = run_case(func, rounds=args.rounds)
+        results_d[name] = res_d
+        cmp_str = ''
+        if name in baseline_d:
+            t_ratio, m_ratio, is_regress = compare(res_d, baseline_d[name], tolerance=args.tolerance)
+            cmp_str = f'time {t_ratio:+.0%} mem {m_ratio:+.0%}'
+            if is_regress:
+                regressions_l.append(name)
+                cmp_str += ' REGRESSION'
+        print(f'{name:<26} {res_d["median_ms"]:>12.3f} {res_d["min_ms"]:>10.3f} {res_d["peak_kb"]:>10.1f}  {cmp_str}')
+
+    # store or check
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(results_d, f, indent=2)
+        print(f'baseline saved to {BASELINE_FILE}')
+    elif regressions_l:
+        print(f'regression(s) vs baseline (tolerance {args.tolerance:.0%}): {", ".join(regressions_l)}')
+        sys.exit(1)
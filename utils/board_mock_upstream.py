@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+"""
+Local stand-in for the upstream servers of board-import-app (for load tests without internet).
+
+Replay recorded payloads of utils/bench-fixtures/ for every url used by the import apps, serve a WebDAV directory
+(PROPFIND, sync-collection REPORT and GET) and generated images for webcams/traffic map. Import apps are redirect
+to it with env vars:
+
+    ./board_mock_upstream.py --port 8080 --latency 200 --error-rate 0.05 --scale 4
+    BOARD_UPSTREAM_URL=http://[mock host]:8080 BOARD_SCHED_SPEEDUP=100 python3 app.py
+
+Urls are map as http://[mock host]:8080/[upstream host]/[upstream path]?[upstream query].
+"""
+
+import argparse
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import random
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from xml.sax.saxutils import escape
+import PIL.Image
+import PIL.ImageDraw
+
+# some const
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(HERE, 'bench-fixtures')
+# routes: (upstream host, path regex, fixture file or None for a generated image, content type)
+ROUTES = [
+    ('services3.arcgis.com', r'.*/query$', 'atmo-hdf.json', 'application/json'),
+    ('services8.arcgis.com', r'.*/query$', 'atmo-hdf.json', 'application/json'),
+    ('api.openweathermap.org', r'/data/2.5/forecast$', 'owm-forecast.json', 'application/json'),
+    ('api.twitter.com', r'/1.1/search/tweets.json$', 'tw-search.json', 'application/json'),
+    ('api.twitter.com', r'/1.1/statuses/user_timeline.json$', 'tw-search.json', 'application/json'),
+    ('vigilance.meteofrance.com', r'/data/NXFR34_LFPW_.xml$', 'vigilance.xml', 'text/xml'),
+    ('tgftp.nws.noaa.gov', r'/data/observations/metar/stations/\w+.TXT$', 'metar-LFQQ.TXT', 'text/plain'),
+    ('france3-regions.francetvinfo.fr', r'/societe/rss$', 'rss-france3.xml', 'application/rss+xml'),
+    ('webcam.dir-est.fr', r'/app.php/lastimg/\d+$', None, 'image/jpeg'),
+    ('docs.google.com', r'.*', 'gsheet.csv', 'text/csv'),
+]
+# XML blocks and json lists replicate by --scale
+SCALE_XML_RE = re.compile(r'(<item>.*?</item>|<datavigilance .*?</datavigilance>)\s*', re.DOTALL)
+SCALE_JSON_KEYS = ('features', 'list', 'statuses')
+
+
+# some class
+class Stats:
+    lock = threading.Lock()
+    requests = 0
+    errors = 0
+    not_modified = 0
+    bytes_sent = 0
+
+    @classmethod
+    def add(cls, nb_bytes=0, error=False, not_modified=False):
+        with cls.lock:
+            cls.requests += 1
+            cls.errors += int(error)
+            cls.not_modified += int(not_modified)
+            cls.bytes_sent += nb_bytes
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # set by main
+    args = None
+    payloads_d = {}
+    sync_lock = threading.Lock()
+    sync_snapshots_d = {}
+
+    def log_message(self, fmt, *args):
+        logging.debug(fmt % args)
+
+    def _split_path(self):
+        # "/[upstream host]/[upstream path]?query" -> (upstream host, upstream path)
+        url_parts = urllib.parse.urlsplit(self.path)
+        host, _, path = url_parts.path.lstrip('/').partition('/')
+        return host, '/' + path
+
+    def _inject(self):
+        # simulate upstream latency and errors, return True if an error is send
+        if self.args.latency:
+            time.sleep(max(random.gauss(self.args.latency, self.args.jitter), 0.0) / 1000)
+        if random.random() < self.args.error_rate:
+            self._send(503, b'service unavailable (mock)', 'text/plain', error=True)
+            return True
+        return False
+
+    def _send(self, code, body=b'', content_type='text/plain', headers=None, error=False):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+        Stats.add(len(body), error=error, not_modified=code == 304)
+
+    def _send_payload(self, body, content_type):
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, headers={'ETag': etag})
+        else:
+            self._send(200, body, content_type, headers={'ETag': etag})
+
+    def do_GET(self):
+        if self._inject():
+            return
+        host, path = self._split_path()
+        # webdav file
+        if path.startswith(self.args.webdav_prefix):
+            return self._webdav_get(path[len(self.args.webdav_prefix):])
+        # recorded payloads
+        for r_host, r_path, fixture, content_type in ROUTES:
+            if host == r_host and re.match(r_path, path):
+                return self._send_payload(self.payloads_d[fixture or 'webcam'], content_type)
+        # any other image (like gmap traffic)
+        if os.path.splitext(path)[1].lower() in ('.png', '.jpg', '.jpeg') or 'img' in path:
+            return self._send_payload(self.payloads_d['webcam'], 'image/jpeg')
+        self._send(404, b'no route for this url (mock)')
+
+    do_HEAD = do_GET
+
+    def do_PROPFIND(self):
+        # discard request body
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self._inject():
+            return
+        host, path = self._split_path()
+        if not path.startswith(self.args.webdav_prefix):
+            return self._send(404, b'not a webdav path (mock)')
+        rel_path = urllib.parse.unquote(path[len(self.args.webdav_prefix):])
+        fs_path = os.path.join(self.args.webdav_dir, rel_path)
+        if not os.path.exists(fs_path):
+            return self._send(404, b'not found (mock)')
+        # build multistatus response: item itself and its children (for depth 1)
+        items_l = [rel_path]
+        if os.path.isdir(fs_path) and self.headers.get('Depth', '1') != '0':
+            items_l += [os.path.join(rel_path, f) for f in sorted(os.listdir(fs_path))]
+        xml_l = ['<?xml version="1.0" encoding="utf-8"?>', '<d:multistatus xmlns:d="DAV:">']
+        xml_l += [self._dav_response(host, item) for item in items_l]
+        xml_l.append('</d:multistatus>')
+        self._send(207, '\n'.join(xml_l).encode(), 'application/xml; charset=utf-8')
+
+    def do_REPORT(self):
+        # sync-collection REPORT (RFC 6578): tokens are snapshots of the WebDAV tree kept in memory
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8', 'replace')
+        if self.args.no_sync_collection:
+            return self._send(501, b'REPORT is not implemented (mock)')
+        if self._inject():
+            return
+        host, path = self._split_path()
+        if not path.startswith(self.args.webdav_prefix):
+            return self._send(404, b'not a webdav path (mock)')
+        rel_path = urllib.parse.unquote(path[len(self.args.webdav_prefix):])
+        token_match = re.search(r'sync-token>([^<]*)<', body)
+        token = token_match.group(1).strip() if token_match else ''
+        with self.sync_lock:
+            if token and token not in self.sync_snapshots_d:
+                return self._send(403, b'<?xml version="1.0" encoding="utf-8"?>'
+                                       b'<d:error xmlns:d="DAV:"><d:valid-sync-token/></d:error>',
+                                  'application/xml; charset=utf-8')
+            old_snap_d = self.sync_snapshots_d.get(token, {})
+            new_snap_d = tree_snapshot(self.args.webdav_dir, rel_path)
+            new_token = f'urn:mock-sync:{len(self.sync_snapshots_d) + 1}'
+            self.sync_snapshots_d[new_token] = new_snap_d
+        xml_l = ['<?xml version="1.0" encoding="utf-8"?>', '<d:multistatus xmlns:d="DAV:">']
+        for item, state in new_snap_d.items():
+            if old_snap_d.get(item) != state:
+                xml_l.append(self._dav_response(host, item))
+        for item in old_snap_d:
+            if item not in new_snap_d:
+                href = urllib.parse.quote(f'/{host}{self.args.webdav_prefix}{item}')
+                xml_l.append(f'<d:response><d:href>{escape(href)}</d:href>'
+                             f'<d:status>HTTP/1.1 404 Not Found</d:status></d:response>')
+        xml_l.append(f'<d:sync-token>{escape(new_token)}</d:sync-token>')
+        xml_l.append('</d:multistatus>')
+        self._send(207, '\n'.join(xml_l).encode(), 'application/xml; charset=utf-8')
+
+    def _dav_response(self, host, item):
+        # DAV:response XML block of item (path relative to WebDAV root)
+        item_fs = os.path.join(self.args.webdav_dir, item)
+        is_dir = os.path.isdir(item_fs)
+        href = f'/{host}{self.args.webdav_prefix}{item}'
+        href = urllib.parse.quote(href + '/' if is_dir and not href.endswith('/') else href)
+        mtime = formatdate(os.path.getmtime(item_fs), usegmt=True)
+        if is_dir:
+            file_props = ''
+        else:
+            stat = os.stat(item_fs)
+            content_type = mimetypes.guess_type(item_fs)[0] or 'application/octet-stream'
+            file_props = f'<d:getcontentlength>{stat.st_size}</d:getcontentlength>' \
+                         f'<d:getetag>{file_etag(item_fs)}</d:getetag>' \
+                         f'<d:getcontenttype>{content_type}</d:getcontenttype>'
+        return f'<d:response><d:href>{escape(href)}</d:href><d:propstat><d:prop>' \
+               f'<d:getlastmodified>{mtime}</d:getlastmodified>{file_props}</d:prop>' \
+               f'<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+
+    def _webdav_get(self, rel_path):
+        fs_path = os.path.join(self.args.webdav_dir, urllib.parse.unquote(rel_path))
+        if not os.path.isfile(fs_path):
+            return self._send(404, b'not found (mock)')
+        with open(fs_path, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(fs_path)[0] or 'application/octet-stream'
+        # partial content (resume of a download), only if file is unchanged (If-Range)
+        etag = file_etag(fs_path)
+        range_match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if range_match and self.headers.get('If-Range', etag) == etag:
+            start = int(range_match.group(1))
+            if start >= len(body):
+                return self._send(416, headers={'Content-Range': f'bytes */{len(body)}'})
+            return self._send(206, body[start:], content_type,
+                              headers={'ETag': etag, 'Content-Range': f'bytes {start}-{len(body) - 1}/{len(body)}'})
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers={'ETag': etag})
+        # OwnCloud send checksums of uploaded files
+        headers_d = {'ETag': etag, 'Last-Modified': formatdate(os.path.getmtime(fs_path), usegmt=True),
+                     'OC-Checksum': f'MD5:{hashlib.md5(body).hexdigest()}'}
+        self._send(200, body, content_type, headers=headers_d)
+
+
+# some function
+def file_etag(fs_path):
+    # WebDAV file ETag (like Apache: from mtime and size)
+    stat = os.stat(fs_path)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def tree_snapshot(root, rel_path=''):
+    # {item path (relative to root): (mtime_ns, size)} of all files and sub-directories of root/rel_path
+    snap_d = {}
+    for dir_path, dir_names, file_names in os.walk(os.path.join(root, rel_path)):
+        for name in dir_names + file_names:
+            fs_path = os.path.join(dir_path, name)
+            stat = os.stat(fs_path)
+            snap_d[os.path.relpath(fs_path, root)] = (stat.st_mtime_ns, stat.st_size)
+    return snap_d
+
+
+def scale_payload(data, scale):
+    # replicate list items of json payload and items blocks of XML payload
+    if scale <= 1:
+        return data
+    try:
+        js_d = json.loads(data)
+        for key in SCALE_JSON_KEYS:
+            if isinstance(js_d, dict) and isinstance(js_d.get(key), list):
+                js_d[key] = js_d[key] * scale
+        return json.dumps(js_d).encode()
+    except ValueError:
+        pass
+    txt = data.decode('iso-8859-1')
+    blocks_l = SCALE_XML_RE.findall(txt)
+    if blocks_l:
+        end = txt.rindex(blocks_l[-1]) + len(blocks_l[-1])
+        txt = txt[:end] + ''.join(blocks_l) * (scale - 1) + txt[end:]
+    return txt.encode('iso-8859-1')
+
+
+def gen_image(width, height, fmt='JPEG', label='mock'):
+    img = PIL.Image.effect_noise((width, height), 64).convert('RGB')
+    PIL.ImageDraw.Draw(img).text((10, 10), f'{label} {datetime.now():%H:%M:%S}', (255, 255, 255))
+    img_io = io.BytesIO()
+    img.save(img_io, format=fmt)
+    return img_io.getvalue()
+
+
+def gen_webdav_dir(scale):
+    # temporary webdav tree with carousel images and a reglement document (directories of board.conf examples)
+    root = tempfile.mkdtemp(prefix='board-mock-webdav-')
+    for sub_dir, nb_files, ext in (('Carousel upload', 4 * scale, 'png'), ('Affichage réglementaire', 1, 'pdf')):
+        os.makedirs(os.path.join(root, sub_dir))
+        for i in range(nb_files):
+            fmt = 'PDF' if ext == 'pdf' else 'PNG'
+            with open(os.path.join(root, sub_dir, f'mock-{i:03d}.{ext}'), 'wb') as f:
+                f.write(gen_image(1280, 720, fmt=fmt, label=f'{sub_dir} {i}'))
+    return root
+
+
+# main
+if __name__ == '__main__':
+    # parse command line
+    parser = argparse.ArgumentParser(description='local stand-in for board-import-app upstream servers')
+    parser.add_argument('-a', '--address', default='0.0.0.0', help='bind address (default is 0.0.0.0)')
+    parser.add_argument('-p', '--port', type=int, default=8080, help='listen port (default is 8080)')
+    parser.add_argument('-l', '--latency', type=float, default=0.0, help='mean latency of responses in ms')
+    parser.add_argument('-j', '--jitter', type=float, default=0.0, help='latency standard deviation in ms')
+    parser.add_argument('-e', '--error-rate', type=float, default=0.0, help='ratio of HTTP 503 responses (0 to 1)')
+    parser.add_argument('-s', '--scale', type=int, default=1, help='payloads scale factor (items replication)')
+    parser.add_argument('--webdav-prefix', default='/owncloud/remote.php/webdav/',
+                        help='path of WebDAV root in upstream url (default is /owncloud/remote.php/webdav/)')
+    parser.add_argument('--webdav-dir', default='',
+                        help='directory serve as WebDAV root (default is a generated temporary tree)')
+    parser.add_argument('--no-sync-collection', action='store_true',
+                        help='reply HTTP 501 to sync-collection REPORT (like a server without RFC 6578 support)')
+    parser.add_argument('-d', '--debug', action='store_true', help='debug mode (log every request)')
+    args = parser.parse_args()
+
+    # logging setup
+    logging.basicConfig(format='%(asctime)s %(message)s', level=logging.DEBUG if args.debug else logging.INFO)
+
+    # load and scale payloads
+    payloads_d = {}
+    for _, _, fixture, _ in ROUTES:
+        if fixture:
+            with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+                payloads_d[fixture] = scale_payload(f.read(), args.scale)
+    payloads_d['webcam'] = gen_image(640 * args.scale, 480 * args.scale, label='webcam')
+    if not args.webdav_dir:
+        args.webdav_dir = gen_webdav_dir(args.scale)
+    logging.info(f'WebDAV root is "{args.webdav_dir}" (at upstream path "{args.webdav_prefix}")')
+
+    # start server
+    MockHandler.args = args
+    MockHandler.payloads_d = payloads_d
+    server = ThreadingHTTPServer((args.address, args.port), MockHandler)
+    server.daemon_threads = True
+    logging.info(f'mock upstream listen on http://{args.address}:{args.port}/')
+    t_start = time.monotonic()
+    # stop on SIGTERM as on SIGINT (print stats at exit)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.monotonic() - t_start
+        logging.info(f'{Stats.requests} requests in {elapsed:.0f}s ({Stats.requests / elapsed:.1f} req/s), '
+                     f'{Stats.errors} errors, {Stats.not_modified} not modified, '
+                     f'{Stats.bytes_sent / 1024:.0f} kB sent')